@@ -0,0 +1,279 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+from PIL import Image, ImageGrab, ImageSequence
+from dotenv import load_dotenv
+from panel_emulator import get_client
+from calibration import load_calibration
+
+# Configuration
+load_dotenv()
+DEVICE_MAC = os.getenv("DEVICE_MAC", "95:0B:57:BF:8F:8D")
+AMBILIGHT_FPS = float(os.getenv("AMBILIGHT_FPS", "4"))                # Target samples per second
+AMBILIGHT_SMOOTHING = float(os.getenv("AMBILIGHT_SMOOTHING", "0.5"))  # Weight of each new sample, 1 = no smoothing
+AMBILIGHT_THRESHOLD = float(os.getenv("AMBILIGHT_THRESHOLD", "3"))    # Mean change (0-255) needed to upload
+PANEL_SIZE = (32, 32)
+REPORT_INTERVAL = 60  # Seconds between FPS reports
+RECONNECT_INTERVAL = 5  # Seconds between reconnect attempts after a failed send
+
+# --- Frame sources ---
+# A source returns the frame due `elapsed` seconds after start as an HxWx3
+# uint8 array, or None once it has nothing more to show.
+
+class ScreenSource:
+    """Grabs a screen region (left, top, right, bottom), or the whole screen."""
+
+    def __init__(self, region=None):
+        self.region = region
+
+    def read(self, elapsed):
+        return np.asarray(ImageGrab.grab(bbox=self.region).convert('RGB'))
+
+    def close(self):
+        pass
+
+class VideoSource:
+    """Plays a video file in real time (needs opencv-python)."""
+
+    def __init__(self, path):
+        try:
+            import cv2
+        except ImportError:
+            raise RuntimeError("Video sources need opencv-python (pip install opencv-python)")
+        self.cv2 = cv2
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Cannot open video: {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.position = 0
+        self.frame = None
+
+    def read(self, elapsed):
+        # Skip the frames we were too slow to sample, without decoding them
+        target = int(elapsed * self.fps)
+        while self.position <= target:
+            if not self.capture.grab():
+                return None
+            self.position += 1
+            self.frame = None
+        if self.frame is None:
+            ok, bgr = self.capture.retrieve()
+            if not ok:
+                return None
+            self.frame = self.cv2.cvtColor(bgr, self.cv2.COLOR_BGR2RGB)
+        return self.frame
+
+    def close(self):
+        self.capture.release()
+
+class ImageSequenceSource:
+    """Plays a glob of image files, or the frames of an animated GIF, at `fps`."""
+
+    def __init__(self, pattern, fps=10):
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            raise RuntimeError(f"No images match: {pattern}")
+        if len(paths) == 1:
+            with Image.open(paths[0]) as img:
+                self.frames = [np.asarray(frame.convert('RGB')) for frame in ImageSequence.Iterator(img)]
+        else:
+            self.frames = [np.asarray(Image.open(path).convert('RGB')) for path in paths]
+        self.fps = fps
+
+    def read(self, elapsed):
+        index = int(elapsed * self.fps)
+        return self.frames[index] if index < len(self.frames) else None
+
+    def close(self):
+        pass
+
+# --- Processing ---
+
+def block_average(frame, size=PANEL_SIZE):
+    """Downsamples an HxWx3 array to the panel size by averaging equal pixel blocks.
+
+    The whole region is squeezed onto the panel (no crop to square); the few
+    rows/columns that do not fill a block are trimmed evenly from the edges.
+    Returns a float32 array of shape (height, width, 3).
+    """
+    h, w = frame.shape[:2]
+    if h < size[1] or w < size[0]:
+        # Smaller than the panel: repeat pixels so every block has at least one
+        frame = frame.repeat(-(-size[1] // h), axis=0).repeat(-(-size[0] // w), axis=1)
+        h, w = frame.shape[:2]
+    bh, bw = h // size[1], w // size[0]
+    y0, x0 = (h - bh * size[1]) // 2, (w - bw * size[0]) // 2
+    # Sum whole rows of each block first (contiguous, fast), then the columns of the small result
+    rows = frame[y0:y0 + bh * size[1]].reshape(size[1], bh, w, -1).sum(axis=1, dtype=np.uint32)
+    blocks = rows[:, x0:x0 + bw * size[0], :3].reshape(size[1], size[0], bw, 3).sum(axis=2)
+    return blocks.astype(np.float32) / (bh * bw)
+
+class Ambilight:
+    """Samples a frame source, smooths it over time and mirrors it on the panel.
+
+    Each sample is block-averaged to 32x32 and blended into a running average
+    (`smoothing` is the weight of the new sample). A frame is only uploaded
+    when it differs from the one on the panel by at least `threshold` on
+    average, so static scenes cost no link time at all.
+    """
+
+    def __init__(self, mac_address, source, fps=AMBILIGHT_FPS, smoothing=AMBILIGHT_SMOOTHING,
+                 threshold=AMBILIGHT_THRESHOLD):
+        self.mac_address = mac_address
+        self.client = get_client(mac_address)
+        self.calibration = load_calibration(mac_address)
+        self.source = source
+        self.fps = fps
+        self.smoothing = smoothing
+        self.threshold = threshold
+        self.is_connected = False
+        self.last_reconnect = 0
+
+        self.state = None  # Smoothed frame, float32
+        self.shown = None  # Last frame uploaded, uint8
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats_start = time.monotonic()
+        self.samples = 0
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.upload_time = 0.0
+        self.process_time = 0.0
+
+    def connect(self):
+        print(f"Connecting to {self.mac_address}...")
+        try:
+            self.client.connect()
+            self.is_connected = True
+            print("Connected!")
+        except Exception as e:
+            print(f"Connection failed: {e}")
+
+    def process(self, frame):
+        """Returns the next 32x32 uint8 frame to upload, or None if the change is too small."""
+        start = time.perf_counter()
+        sample = block_average(frame)
+        if self.state is None:
+            self.state = sample
+        else:
+            self.state += self.smoothing * (sample - self.state)
+        out = np.rint(self.state).astype(np.uint8)
+        self.process_time += time.perf_counter() - start
+
+        if self.shown is not None and np.abs(out.astype(np.int16) - self.shown).mean() < self.threshold:
+            return None
+        return out
+
+    def reconnect(self):
+        """Tries to reconnect at most every RECONNECT_INTERVAL; returns True once connected."""
+        now = time.monotonic()
+        if now - self.last_reconnect < RECONNECT_INTERVAL:
+            return False
+        self.last_reconnect = now
+        try:
+            self.client.connect()
+            self.is_connected = True
+            print("Reconnected.")
+        except Exception as e:
+            print(f"Reconnect failed, retrying in {RECONNECT_INTERVAL}s: {e}")
+        return self.is_connected
+
+    def send(self, out, temp_path="ambilight.png"):
+        if not self.is_connected and not self.reconnect():
+            return  # Frames are dropped until the link is back, `shown` keeps the last good one
+        self.calibration.apply(Image.fromarray(out, 'RGB')).save(temp_path)
+        start = time.monotonic()
+        try:
+            self.client.send_image(temp_path)
+        except Exception as e:
+            print(f"Failed to send frame: {e}")
+            self.is_connected = False
+            self.reconnect()
+            return
+        self.upload_time += time.monotonic() - start
+        self.upload_bytes += os.path.getsize(temp_path)
+        self.uploads += 1
+        self.shown = out
+
+    def report(self):
+        """Prints achieved sample/upload rates against what the link can carry."""
+        took = time.monotonic() - self.stats_start
+        if not self.samples or took <= 0:
+            return
+        print(f"Ambilight: {self.samples / took:.1f} samples/s (target {self.fps:g}), "
+              f"{self.uploads / took:.2f} uploads/s, {self.samples - self.uploads} static frames skipped, "
+              f"{self.process_time / self.samples * 1000:.2f} ms processing per sample")
+        if self.uploads:
+            per_upload = self.upload_time / self.uploads
+            rate = self.upload_bytes / self.upload_time if self.upload_time > 0 else 0
+            budget = 1 / per_upload if per_upload > 0 else float("inf")
+            print(f"  Link: {rate:.0f} B/s, {self.upload_bytes / self.uploads:.0f} B/frame, "
+                  f"{per_upload * 1000:.0f} ms/upload -> at most {budget:.2f} uploads/s")
+            if budget < self.fps:
+                print(f"  Target of {self.fps:g} FPS exceeds the link budget; changing scenes will lag")
+
+    def run(self, duration=None):
+        self.connect()
+        if not self.is_connected:
+            return
+
+        print(f"Ambilight running at {self.fps:g} FPS... Press Ctrl+C to stop.")
+        interval = 1 / self.fps
+        start = next_tick = time.monotonic()
+        last_report = start
+        try:
+            while duration is None or time.monotonic() - start < duration:
+                frame = self.source.read(time.monotonic() - start)
+                if frame is None:
+                    print("Source finished.")
+                    break
+                self.samples += 1
+                out = self.process(frame)
+                if out is not None:
+                    self.send(out)
+
+                if time.monotonic() - last_report >= REPORT_INTERVAL:
+                    self.report()
+                    self.reset_stats()
+                    last_report = time.monotonic()
+
+                # Uploads slower than the interval push the schedule back instead of bursting
+                next_tick = max(next_tick + interval, time.monotonic())
+                time.sleep(max(0, next_tick - time.monotonic()))
+        except KeyboardInterrupt:
+            print("Stopping...")
+        finally:
+            self.report()
+            self.source.close()
+            self.client.disconnect()
+            if os.path.exists("ambilight.png"):
+                os.remove("ambilight.png")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror the screen, a video or an image sequence on the panel.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--video", help="Video file to play instead of the screen")
+    group.add_argument("--images", help="Glob of image files, or an animated GIF, to play instead of the screen")
+    parser.add_argument("--region", help="Screen region as left,top,right,bottom (default: whole screen)")
+    parser.add_argument("--fps", type=float, default=AMBILIGHT_FPS, help="Target samples per second")
+    parser.add_argument("--source-fps", type=float, default=10, help="Playback rate of --images")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.video:
+        source = VideoSource(args.video)
+    elif args.images:
+        source = ImageSequenceSource(args.images, args.source_fps)
+    else:
+        region = tuple(int(v) for v in args.region.split(",")) if args.region else None
+        source = ScreenSource(region)
+
+    Ambilight(DEVICE_MAC, source, fps=args.fps).run(args.duration)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
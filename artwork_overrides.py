@@ -0,0 +1,128 @@
+import os
+import json
+import fnmatch
+from PIL import Image, ImageOps, ImageSequence
+from dotenv import load_dotenv
+
+# Configuration
+load_dotenv()
+ARTWORK_CONFIG = os.getenv("ARTWORK_CONFIG", "artwork.json")
+PANEL_SIZE = (32, 32)
+DEFAULT_FRAME_MS = 100
+
+class Artwork:
+    """Pre-decoded panel frames for one override (a single frame or an animation)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.frames = []
+        self.durations = []
+        with Image.open(path) as img:
+            for frame in ImageSequence.Iterator(img):
+                self.durations.append(frame.info.get("duration", DEFAULT_FRAME_MS) or DEFAULT_FRAME_MS)
+                rgba = frame.convert("RGBA")
+                fitted = ImageOps.fit(rgba, PANEL_SIZE, Image.Resampling.LANCZOS)
+                # Transparent parts are black on the LED panel
+                bg = Image.new("RGB", PANEL_SIZE, (0, 0, 0))
+                bg.paste(fitted, (0, 0), fitted)
+                self.frames.append(bg)
+
+    @property
+    def animated(self):
+        return len(self.frames) > 1
+
+class ArtworkOverrides:
+    """User-editable exe name -> artwork mapping, compiled for fast lookups.
+
+    `artwork.json` maps exe names or glob patterns (matched against the exe
+    name, or the full path if the pattern contains a slash) to image or GIF
+    files. Exact names go into a dict, patterns into a list checked in file
+    order. Assets are decoded once and kept in memory; `reload()` re-decodes
+    only entries whose mapping or file changed.
+    """
+
+    def __init__(self, config_path=ARTWORK_CONFIG):
+        self.config_path = config_path
+        self.config_mtime = None
+        self.exact = {}     # exe name (lowercase) -> Artwork
+        self.patterns = []  # [(pattern, Artwork)] in config order
+        self.assets = {}    # asset path -> Artwork, shared between entries
+        self.reload()
+
+    def _read_config(self):
+        try:
+            with open(self.config_path) as f:
+                return json.load(f)
+        except OSError:
+            return {}
+        except ValueError as e:
+            print(f"Ignoring invalid {self.config_path}: {e}")
+            return None
+
+    def _asset(self, path):
+        """Returns the decoded artwork for a path, decoding only if new or modified."""
+        path = os.path.expanduser(path)
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), path)
+        art = self.assets.get(path)
+        try:
+            if art is None or os.path.getmtime(path) != art.mtime:
+                art = Artwork(path)
+                print(f"Loaded artwork override: {os.path.basename(path)} ({len(art.frames)} frame(s))")
+        except Exception as e:
+            print(f"Failed to load artwork {path}: {e}")
+            return None
+        return art
+
+    def reload(self):
+        """Re-reads the config if it changed on disk; returns True if anything was reloaded."""
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            mtime = None
+        if mtime == self.config_mtime and not self._assets_changed():
+            return False
+        self.config_mtime = mtime
+
+        mapping = self._read_config()
+        if mapping is None:
+            return False  # Keep the last good config while the file is being edited
+
+        exact, patterns, assets = {}, [], {}
+        for key, path in mapping.items():
+            art = assets.get(path) or self._asset(path)
+            if art is None:
+                continue
+            assets[path] = art
+            key = key.lower()
+            if any(ch in key for ch in "*?["):
+                patterns.append((key, art))
+            else:
+                exact[key] = art
+
+        self.exact, self.patterns = exact, patterns
+        self.assets = {art.path: art for art in assets.values()}
+        print(f"Artwork overrides: {len(exact)} exact, {len(patterns)} pattern(s)")
+        return True
+
+    def _assets_changed(self):
+        for path, art in self.assets.items():
+            try:
+                if os.path.getmtime(path) != art.mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def lookup(self, exe_path):
+        """Returns the Artwork for an executable, or None to fall back to its icon."""
+        full = exe_path.lower().replace("\\", "/")
+        name = full.rsplit("/", 1)[-1]
+        art = self.exact.get(name)
+        if art is not None:
+            return art
+        for pattern, art in self.patterns:
+            if fnmatch.fnmatchcase(full if "/" in pattern else name, pattern):
+                return art
+        return None
@@ -0,0 +1,72 @@
+import sys
+import time
+import statistics
+
+# Benchmarks run locally without a panel: python benchmark.py [name ...]
+
+def measure(fn, runs):
+    """Calls fn(i) `runs` times and returns the per-call timings in milliseconds."""
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def summary(name, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"  {name:<28} mean {statistics.mean(timings):7.3f} ms   p99 {p99:7.3f} ms   ({len(timings)} runs)")
+
+def bench_compositor(runs=1440):
+    """Clock face composition: layered scene vs redrawing every layer, one day of minutes."""
+    import contextlib
+    import io
+    from custom_clock import CustomClock
+
+    clock = CustomClock("00:00:00:00:00:00")
+    clock.last_weather = "116"
+    clock.last_weather_fetch = time.time() + 10 ** 9  # Never hit the network
+    base = time.mktime(time.strptime("2026-01-01", "%Y-%m-%d"))
+
+    compose_times = []
+    def retained(i):
+        clock.render_time("ffffff", base + i * 60)
+        compose_times.append(clock.scene.compose_time * 1000)
+
+    def full_redraw(i):
+        # What every render cost before: all layers repainted, whole frame composited
+        for layer in clock.scene.layers.values():
+            layer.key = None
+        clock.scene.dirty.append((0, 0, 32, 32))
+        clock.render_time("ffffff", base + i * 60)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = measure(full_redraw, runs)
+        kept = measure(retained, runs)
+
+    summary("full redraw", full)
+    summary("retained render", kept)
+    summary("compose (dirty only)", compose_times)
+
+def bench_ambilight(runs=100):
+    """Ambilight downsampling of a 1080p capture: NumPy block average vs Pillow resize."""
+    import numpy as np
+    from PIL import Image
+    from ambilight import block_average
+
+    frames = [np.random.default_rng(i).integers(0, 256, (1080, 1920, 3), dtype=np.uint8) for i in range(4)]
+    summary("block_average", measure(lambda i: block_average(frames[i % 4]), runs))
+    summary("Image.resize (box)", measure(lambda i: Image.fromarray(frames[i % 4]).resize((32, 32), Image.Resampling.BOX), runs))
+    summary("Image.resize (lanczos)", measure(lambda i: Image.fromarray(frames[i % 4]).resize((32, 32), Image.Resampling.LANCZOS), runs))
+
+BENCHMARKS = {
+    "compositor": bench_compositor,
+    "ambilight": bench_ambilight,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"{name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import argparse
+from PIL import Image, ImageDraw
+from dotenv import load_dotenv
+
+# Configuration
+load_dotenv()
+DEVICE_MAC = os.getenv("DEVICE_MAC", "95:0B:57:BF:8F:8D")
+CALIBRATION_PATH = os.getenv("CALIBRATION", "calibration.json")
+
+DEFAULT_PROFILE = {
+    "gamma": [1.0, 1.0, 1.0],           # Per channel, < 1 lifts darks, > 1 deepens them
+    "white_point": [255, 255, 255],     # Channel gains, e.g. [255, 240, 200] tames a blue cast
+    "brightness": 1.0,                  # Overall cap, 0-1
+}
+GAMMA_RANGE = (0.1, 10.0)
+
+def _clamp(value, low, high):
+    value = float(value)
+    if value != value:  # NaN
+        raise ValueError("not a number")
+    return max(low, min(high, value))
+
+def clean_profile(profile):
+    """Returns a complete profile with out-of-range values clamped.
+
+    The file is hand-editable, so a bad value falls back to its default
+    (with a warning) instead of breaking every script that loads it.
+    """
+    clean = dict(DEFAULT_PROFILE)
+    if not isinstance(profile, dict):
+        if profile is not None:
+            print(f"Ignoring invalid calibration profile: {profile!r}")
+        return clean
+    checks = {
+        "gamma": lambda v: [_clamp(g, *GAMMA_RANGE) for g in ([v] * 3 if isinstance(v, (int, float)) else v)],
+        "white_point": lambda v: [round(_clamp(c, 0, 255)) for c in v],
+        "brightness": lambda v: _clamp(v, 0.0, 1.0),
+    }
+    for key, value in profile.items():
+        if key not in checks:
+            clean[key] = value
+            continue
+        try:
+            checked = checks[key](value)
+            if isinstance(checked, list) and len(checked) != 3:
+                raise ValueError("needs three values (r,g,b)")
+        except (TypeError, ValueError) as e:
+            print(f"Ignoring invalid calibration {key} {value!r}: {e}")
+            continue
+        clean[key] = checked
+    return clean
+
+class Calibration:
+    """Per-panel color correction compiled into 256-entry lookup tables.
+
+    The profile is turned into one LUT per channel once; `apply` is then a
+    single `Image.point` pass, run as the last step before a frame is sent.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = clean_profile(profile)
+        self.lut = self.compile()
+        self.identity = self.lut == list(range(256)) * 3
+
+    def compile(self):
+        gamma = self.profile["gamma"]
+        white = self.profile["white_point"]
+        cap = self.profile["brightness"]
+
+        lut = []
+        for c in range(3):
+            gain = white[c] / 255 * cap
+            lut += [round(((i / 255) ** gamma[c]) * gain * 255) for i in range(256)]
+        return lut
+
+    def apply(self, img):
+        """Returns the image with the profile applied (RGB)."""
+        img = img.convert('RGB')
+        return img if self.identity else img.point(self.lut)
+
+    def apply_hex(self, color):
+        """Applies the profile to a hex color string, for text sent as a color."""
+        try:
+            rgb = [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+        except (ValueError, TypeError):
+            return color
+        return "".join(f"{self.lut[c * 256 + v]:02x}" for c, v in enumerate(rgb))
+
+def load_profiles(path=CALIBRATION_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_calibration(mac_address, path=CALIBRATION_PATH):
+    """Returns the Calibration saved for this panel, or an identity one."""
+    return Calibration(load_profiles(path).get(mac_address))
+
+def save_profile(mac_address, profile, path=CALIBRATION_PATH):
+    profiles = load_profiles(path)
+    profiles[mac_address] = profile
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=2)
+
+# --- Test patterns ---
+
+def pattern_ramps():
+    """Grey, red, green and blue ramps, 8 rows each."""
+    img = Image.new('RGB', (32, 32))
+    draw = ImageDraw.Draw(img)
+    for x in range(32):
+        v = round(x * 255 / 31)
+        for row, color in enumerate([(v, v, v), (v, 0, 0), (0, v, 0), (0, 0, v)]):
+            draw.line([(x, row * 8), (x, row * 8 + 7)], fill=color)
+    return img
+
+def pattern_darks():
+    """The darkest 16 grey levels as 8x8 blocks, to spot crushed shadows."""
+    img = Image.new('RGB', (32, 32))
+    draw = ImageDraw.Draw(img)
+    for i in range(16):
+        x, y = (i % 4) * 8, (i // 4) * 8
+        draw.rectangle([x, y, x + 7, y + 7], fill=(i * 2, i * 2, i * 2))
+    return img
+
+def pattern_white():
+    """Full white next to a mid grey, to judge the white point."""
+    img = Image.new('RGB', (32, 32), (255, 255, 255))
+    ImageDraw.Draw(img).rectangle([0, 16, 31, 31], fill=(128, 128, 128))
+    return img
+
+def pattern_colors():
+    """Primary and secondary bars plus the sun and rain colors of the pictograms."""
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+              (0, 255, 255), (255, 0, 255), (255, 200, 0), (0, 150, 255)]
+    img = Image.new('RGB', (32, 32))
+    draw = ImageDraw.Draw(img)
+    for i, color in enumerate(colors):
+        draw.rectangle([i * 4, 0, i * 4 + 3, 31], fill=color)
+    return img
+
+PATTERNS = {
+    "ramps": pattern_ramps,
+    "darks": pattern_darks,
+    "white": pattern_white,
+    "colors": pattern_colors,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show test patterns to tune the panel calibration.")
+    # Checked by hand: argparse rejects an empty list when nargs="*" has choices
+    parser.add_argument("patterns", nargs="*", metavar="pattern",
+                        help=f"Patterns to show: {', '.join(PATTERNS)} (default: all, in turn)")
+    parser.add_argument("--gamma", help="Gamma, one value or r,g,b")
+    parser.add_argument("--white", help="White point as r,g,b (0-255)")
+    parser.add_argument("--brightness", type=float, help="Brightness cap, 0-1")
+    parser.add_argument("--hold", type=float, default=4, help="Seconds per pattern")
+    parser.add_argument("--save", action="store_true", help="Save the resulting profile for this panel")
+    args = parser.parse_args(argv)
+    patterns = args.patterns or list(PATTERNS)
+    unknown = [name for name in patterns if name not in PATTERNS]
+    if unknown:
+        parser.error(f"unknown pattern(s): {', '.join(unknown)} (choose from {', '.join(PATTERNS)})")
+
+    profile = dict(load_calibration(DEVICE_MAC).profile)
+    if args.gamma:
+        try:
+            values = [float(v) for v in args.gamma.split(",")]
+        except ValueError:
+            values = []
+        if len(values) not in (1, 3):
+            parser.error("--gamma takes one number or three (r,g,b)")
+        if not all(v > 0 for v in values):
+            parser.error("--gamma values must be greater than 0")
+        profile["gamma"] = values * 3 if len(values) == 1 else values
+    if args.white:
+        try:
+            values = [int(v) for v in args.white.split(",")]
+        except ValueError:
+            values = []
+        if len(values) != 3:
+            parser.error("--white takes three integers (r,g,b)")
+        profile["white_point"] = values
+    if args.brightness is not None:
+        profile["brightness"] = args.brightness
+    calibration = Calibration(profile)
+    print(f"Profile: {json.dumps(calibration.profile)}")
+
+    from panel_emulator import get_client
+    client = get_client(DEVICE_MAC)
+    try:
+        client.connect()
+        for name in patterns:
+            print(f"Showing pattern: {name} - {PATTERNS[name].__doc__}")
+            calibration.apply(PATTERNS[name]()).save("calibration_pattern.png")
+            client.send_image("calibration_pattern.png")
+            time.sleep(args.hold)
+    except Exception as e:
+        print(f"Failed to show patterns: {e}")
+    finally:
+        client.disconnect()
+        if os.path.exists("calibration_pattern.png"):
+            os.remove("calibration_pattern.png")
+
+    if args.save:
+        save_profile(DEVICE_MAC, calibration.profile)
+        print(f"Saved calibration for {DEVICE_MAC} to {CALIBRATION_PATH}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+import time
+from collections import deque
+
+PRERENDER_LEAD = 5.0    # Seconds before the minute to render the next frame
+DEFAULT_LATENCY = 0.5   # Send latency guess until we have measured one
+LATENCY_SMOOTHING = 0.2 # Weight of the newest sample in the latency average
+REPORT_WINDOW = 24 * 60 # Minute samples kept for the lag/drift report (24 h)
+
+def next_minute(now):
+    """Returns the epoch time of the next hh:mm:00 boundary after `now`."""
+    return (int(now // 60) + 1) * 60
+
+class ClockScheduler:
+    """Lands clock frames on the panel right at each minute boundary.
+
+    The frame for the next minute is rendered `PRERENDER_LEAD` seconds early.
+    The upload is started one measured send latency before hh:mm:00, so the
+    new minute appears on time instead of drifting with every loop.
+    """
+
+    def __init__(self, render, send, lead=PRERENDER_LEAD):
+        # render(when) -> frame for epoch time `when` (None if unchanged), send(frame) -> uploads it
+        self.render = render
+        self.send = send
+        self.lead = lead
+        self.latency = DEFAULT_LATENCY
+        self.boundary = next_minute(time.time())
+        self.frame = None
+        self.lags = deque(maxlen=REPORT_WINDOW)
+        self.last_report = time.time()
+
+    def send_at(self):
+        return self.boundary - self.latency
+
+    def render_at(self):
+        # A send latency longer than the lead moves the render earlier too
+        return min(self.boundary - self.lead, self.send_at())
+
+    def time_until_due(self, now=None):
+        """Seconds until the scheduler needs to run again (render or send)."""
+        now = time.time() if now is None else now
+        if self.frame is None:
+            return max(0.0, self.render_at() - now)
+        return max(0.0, self.send_at() - now)
+
+    def due(self, now=None):
+        return self.time_until_due(now) == 0.0
+
+    def skip_to_now(self):
+        """Drops a stale schedule, e.g. after sleeping or showing other content."""
+        now = time.time()
+        if now > self.boundary:
+            self.boundary = next_minute(now)
+            self.frame = None
+
+    def tick(self):
+        """Renders or sends when due and returns the seconds until the next action."""
+        now = time.time()
+
+        # Woke up too late for this boundary (suspend, long send): resync
+        if now > self.boundary + 30:
+            print("Clock scheduler missed a minute, resyncing...")
+            self.skip_to_now()
+
+        if self.frame is None and now >= self.render_at():
+            self.frame = self.render(self.boundary)
+            if self.frame is None:
+                # The face did not change, nothing to send for this minute
+                self.boundary = next_minute(self.boundary)
+                return self.time_until_due()
+
+        if self.frame is not None and now >= self.send_at():
+            start = time.time()
+            try:
+                self.send(self.frame)
+            except Exception as e:
+                print(f"Failed to send clock frame: {e}")
+            landed = time.time()
+
+            took = landed - start
+            self.latency += LATENCY_SMOOTHING * (took - self.latency)
+            self.lags.append((self.boundary, landed - self.boundary))
+
+            self.boundary = next_minute(max(landed, self.boundary))
+            self.frame = None
+
+            if landed - self.last_report >= 3600:
+                self.report()
+                self.last_report = landed
+
+        return self.time_until_due()
+
+    def run(self):
+        """Blocking loop for scripts that only show the clock."""
+        while True:
+            time.sleep(self.tick())
+
+    def report(self):
+        """Prints worst-case display lag and drift over the last 24 h."""
+        if not self.lags:
+            print("Clock scheduler: no frames sent yet.")
+            return
+        lags = [lag for _, lag in self.lags]
+        late = max(lags)
+        early = min(lags)
+        mean = sum(lags) / len(lags)
+
+        # Drift: how far the landing time wandered from the first to the last hour
+        hour = max(1, min(60, len(lags) // 2))
+        drift = sum(lags[-hour:]) / hour - sum(lags[:hour]) / hour
+
+        hours = (self.lags[-1][0] - self.lags[0][0]) / 3600
+        print(f"Clock scheduler ({len(lags)} frames over {hours:.1f} h): "
+              f"worst lag {late * 1000:+.0f} ms, earliest {early * 1000:+.0f} ms, "
+              f"mean {mean * 1000:+.0f} ms, drift {drift * 1000:+.0f} ms, "
+              f"send latency {self.latency * 1000:.0f} ms")
@@ -0,0 +1,46 @@
+import numpy as np
+from PIL import Image
+
+SAMPLE_SIZE = (32, 32)  # Covers are already panel-sized frames by the time we get them
+MIN_BRIGHTNESS = 48     # Bins darker than this read as black on the LEDs
+TARGET_BRIGHTNESS = 200 # Accent colors are lifted to at least this peak channel
+DEFAULT_COLOR = "ffffff"
+
+def extract_palette(img, count=3):
+    """Returns up to `count` dominant colors of an image as RGB tuples, best first.
+
+    Pixels are quantized to 4 bits per channel and counted in one bincount.
+    Each bin is scored by its share of pixels and its saturation, so a small
+    vivid accent can beat a large grey background.
+    """
+    if img.size != SAMPLE_SIZE:
+        img = img.resize(SAMPLE_SIZE, Image.Resampling.BOX)
+    px = np.asarray(img.convert('RGB'), dtype=np.uint8).reshape(-1, 3)
+
+    q = px >> 4
+    keys = (q[:, 0].astype(np.intp) << 8) | (q[:, 1].astype(np.intp) << 4) | q[:, 2]
+    counts = np.bincount(keys, minlength=4096)
+    used = np.flatnonzero(counts)
+
+    # Mean color of the pixels falling in each used bin
+    means = np.stack([np.bincount(keys, weights=px[:, c], minlength=4096)[used] for c in range(3)], axis=1)
+    means /= counts[used, None]
+
+    peak = means.max(axis=1)
+    saturation = (peak - means.min(axis=1)) / np.maximum(peak, 1)
+    score = counts[used] * (0.1 + saturation) ** 2 * (peak >= MIN_BRIGHTNESS)
+
+    best = np.argsort(score)[::-1][:count]
+    return [tuple(int(v) for v in means[i]) for i in best if score[i] > 0]
+
+def accent_color(img):
+    """Returns the cover's accent color as a hex string, bright enough for the panel."""
+    palette = extract_palette(img, count=1)
+    if not palette:
+        return DEFAULT_COLOR
+    r, g, b = palette[0]
+    peak = max(r, g, b)
+    if peak < TARGET_BRIGHTNESS:
+        scale = TARGET_BRIGHTNESS / peak
+        r, g, b = (min(255, int(v * scale)) for v in (r, g, b))
+    return f"{r:02x}{g:02x}{b:02x}"
@@ -0,0 +1,108 @@
+import time
+from PIL import Image
+
+PANEL_SIZE = (32, 32)
+
+def _intersect(a, b):
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+def paint_background(tile, origin, color=(0, 0, 0)):
+    """Paint callback filling a layer with an opaque color, for background layers."""
+    tile.paste(color + (255,), (0, 0) + tile.size)
+
+class Layer:
+    """A named RGBA tile at a fixed box on the panel.
+
+    The tile is only repainted when the key passed to `Scene.update` changes
+    (e.g. the hour string), so unchanged layers cost nothing per frame.
+    """
+
+    def __init__(self, name, box):
+        self.name = name
+        self.box = box
+        self.key = None
+        self.visible = True
+        self.tile = Image.new('RGBA', (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+
+class Scene:
+    """Retained-mode stack of layers composited into a persistent frame buffer.
+
+    Layers are drawn bottom to top in the order they were added. Changing a
+    layer marks its box dirty, and `compose()` only redraws dirty regions.
+    """
+
+    def __init__(self, size=PANEL_SIZE, background=(0, 0, 0)):
+        self.size = size
+        self.background = background + (255,)
+        self.layers = {}
+        self.framebuffer = Image.new('RGB', size, background)
+        self.dirty = [(0, 0, size[0], size[1])]
+        self.compose_time = 0.0  # Seconds spent in the last compose()
+        self.frames = 0          # Frames whose output actually changed
+
+    def add_layer(self, name, box):
+        self.layers[name] = Layer(name, box)
+        self.dirty.append(box)
+        return self.layers[name]
+
+    def update(self, name, key, paint):
+        """Repaints layer `name` with `paint(tile, draw_offset)` if `key` differs from last time.
+
+        `paint` gets a cleared RGBA tile and the (x, y) panel position of its
+        top-left corner, so it can draw in panel coordinates by subtracting it.
+        """
+        layer = self.layers[name]
+        if layer.key == key:
+            return False
+        layer.key = key
+        layer.tile = Image.new('RGBA', layer.tile.size, (0, 0, 0, 0))
+        paint(layer.tile, layer.box[:2])
+        self.dirty.append(layer.box)
+        return True
+
+    def set_visible(self, name, visible):
+        layer = self.layers[name]
+        if layer.visible != visible:
+            layer.visible = visible
+            self.dirty.append(layer.box)
+
+    def compose(self):
+        """Recomposites dirty regions; returns True if the frame buffer changed."""
+        start = time.perf_counter()
+        changed = False
+        # Skip rects covered by another one (layers sharing a box, a full-frame repaint)
+        rects = []
+        for rect in sorted(set(self.dirty), key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True):
+            if not any(_contains(other, rect) for other in rects):
+                rects.append(rect)
+        for rect in rects:
+            region = Image.new('RGBA', (rect[2] - rect[0], rect[3] - rect[1]), self.background)
+            for layer in self.layers.values():
+                part = _intersect(rect, layer.box) if layer.visible else None
+                if part is None:
+                    continue
+                lx, ly = layer.box[:2]
+                region.alpha_composite(layer.tile, dest=(part[0] - rect[0], part[1] - rect[1]),
+                                       source=(part[0] - lx, part[1] - ly, part[2] - lx, part[3] - ly))
+            region = region.convert('RGB')
+            if region.tobytes() != self.framebuffer.crop(rect).tobytes():
+                self.framebuffer.paste(region, rect[:2])
+                changed = True
+        self.dirty = []
+        if changed:
+            self.frames += 1
+        self.compose_time = time.perf_counter() - start
+        return changed
+
+    def produce(self):
+        """Returns a new frame only when the composited output changed, else None."""
+        return self.framebuffer.copy() if self.compose() else None
+
+    def frame(self):
+        """Composes pending changes and returns the current frame, changed or not."""
+        self.compose()
+        return self.framebuffer.copy()
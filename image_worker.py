@@ -0,0 +1,109 @@
+import io
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+PANEL_SIZE = (32, 32)
+MAX_WORKERS = 2
+MAX_PENDING = 4         # Older jobs are cancelled once this many are queued
+STALL_PROBE_INTERVAL = 0.05
+STALL_REPORT_INTERVAL = 3600
+
+# --- Worker side (runs in the pool processes, must stay picklable) ---
+
+def _pack(img):
+    return img.mode, img.size, img.tobytes()
+
+def decode_cover(data):
+    """Decodes a raw album cover and crops it to a ready-to-send panel frame."""
+    img = Image.open(io.BytesIO(data))
+    img.draft('RGB', (PANEL_SIZE[0] * 2, PANEL_SIZE[1] * 2))  # Cheap JPEG downscale on decode
+    img = ImageOps.fit(img.convert('RGB'), PANEL_SIZE, Image.Resampling.LANCZOS)
+    return _pack(img)
+
+def postprocess_icon(data):
+    """Resizes a captured icon bitmap and flattens it onto black for the panel."""
+    img = Image.open(io.BytesIO(data)).convert("RGBA")
+    img = img.resize(PANEL_SIZE, Image.Resampling.LANCZOS)
+    bg = Image.new("RGB", PANEL_SIZE, (0, 0, 0))
+    bg.paste(img, (0, 0), img)
+    return _pack(bg)
+
+def unpack_frame(packed):
+    mode, size, data = packed
+    return Image.frombytes(mode, size, data)
+
+# --- Event loop side ---
+
+class ImagePool:
+    """Runs CPU-heavy Pillow work in a process pool, off the asyncio loop.
+
+    Jobs are submitted under a key ("cover", "icon"): a new job cancels the
+    previous one with the same key, so a decode for a track that is already
+    gone never gets shown. The queue is bounded by `max_pending`.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.max_pending = max_pending
+        self.jobs = {}  # key -> asyncio future, oldest first
+        self.cancelled = 0
+
+    def submit(self, key, fn, *args):
+        """Queues `fn(*args)` and returns a task resolving to a PIL frame."""
+        self.cancel(key)
+        while len(self.jobs) >= self.max_pending:
+            self.cancel(next(iter(self.jobs)))
+
+        job = asyncio.wrap_future(self.executor.submit(fn, *args))
+        self.jobs[key] = job
+
+        def forget(_):
+            if self.jobs.get(key) is job:
+                del self.jobs[key]
+        job.add_done_callback(forget)
+        return asyncio.ensure_future(self._result(job))
+
+    async def _result(self, job):
+        return unpack_frame(await job)
+
+    def cancel(self, key):
+        job = self.jobs.pop(key, None)
+        if job and not job.done():
+            # Also cancels the pool future if it has not started yet
+            job.cancel()
+            self.cancelled += 1
+
+    def shutdown(self):
+        for key in list(self.jobs):
+            self.cancel(key)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class StallMonitor:
+    """Measures how long the event loop thread is blocked between wakeups."""
+
+    def __init__(self, interval=STALL_PROBE_INTERVAL):
+        self.interval = interval
+        self.worst = 0.0
+        self.worst_at = None
+        self.stalls = 0  # Wakeups more than 100 ms late
+        self.last_report = time.time()
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            stall = time.perf_counter() - start - self.interval
+            if stall > 0.1:
+                self.stalls += 1
+            if stall > self.worst:
+                self.worst = stall
+                self.worst_at = time.strftime("%H:%M:%S")
+            if time.time() - self.last_report >= STALL_REPORT_INTERVAL:
+                self.report()
+                self.last_report = time.time()
+
+    def report(self):
+        print(f"Event loop: worst stall {self.worst * 1000:.0f} ms (at {self.worst_at or '-'}), "
+              f"{self.stalls} stall(s) over 100 ms")
@@ -0,0 +1,178 @@
+import os
+import sys
+import mmap
+import time
+import queue
+import struct
+import argparse
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+# Configuration
+load_dotenv()
+HISTORY_PATH = os.getenv("HISTORY_PATH", "history.bin")    # Fixed-width play records
+STRINGS_PATH = os.getenv("HISTORY_STRINGS", "history.str") # Interned artist/title table
+
+# One play: start time, artist id, title id, track duration, seconds actually listened
+RECORD = struct.Struct("<IIIHH")
+RECORD_DTYPE = np.dtype([("start", "<u4"), ("artist", "<u4"), ("title", "<u4"),
+                         ("duration", "<u2"), ("listened", "<u2")])
+LENGTH = struct.Struct("<H")
+
+def load_strings(path=STRINGS_PATH):
+    """Reads the string table: a sequence of length-prefixed UTF-8 strings, id = position."""
+    return _read_strings(path)[0]
+
+def _read_strings(path):
+    """Returns (strings, byte length of the complete part of the table)."""
+    strings = []
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return strings, 0
+    pos = 0
+    while pos + LENGTH.size <= len(data):
+        (n,) = LENGTH.unpack_from(data, pos)
+        if pos + LENGTH.size + n > len(data):
+            break  # Torn write at the end, ignore it
+        strings.append(data[pos + LENGTH.size:pos + LENGTH.size + n].decode("utf-8", "replace"))
+        pos += LENGTH.size + n
+    return strings, pos
+
+def load_records(path=HISTORY_PATH):
+    """Memory-maps the record file and returns it as a NumPy structured array."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    with f:
+        count = os.fstat(f.fileno()).st_size // RECORD.size
+        if count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        mm = mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ)
+    return np.frombuffer(mm, dtype=RECORD_DTYPE, count=count)
+
+class ListeningHistory:
+    """Append-only log of played tracks, written from a background thread.
+
+    `record()` only puts the play on a queue, so the monitoring loop never
+    waits on disk. The writer thread interns artist and title strings and
+    appends one fixed-width record per play.
+    """
+
+    def __init__(self, path=HISTORY_PATH, strings_path=STRINGS_PATH):
+        self.path = path
+        self.strings_path = strings_path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def record(self, start, artist, title, duration, listened):
+        if not self.thread.is_alive():
+            return  # The files could not be opened, don't queue plays forever
+        self.queue.put_nowait((start, artist or "", title or "", duration, listened))
+
+    def close(self):
+        """Flushes pending plays and stops the writer thread."""
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _writer(self):
+        table, table_size = _read_strings(self.strings_path)
+        ids = {s: i for i, s in enumerate(table)}
+        try:
+            records = open(self.path, "ab")
+            strings = open(self.strings_path, "ab")
+            # Cut torn writes from a crash, so new records and string ids stay aligned
+            records.truncate(os.fstat(records.fileno()).st_size // RECORD.size * RECORD.size)
+            strings.truncate(table_size)
+        except OSError as e:
+            print(f"Listening history disabled: {e}")
+            return
+
+        with records, strings:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                start, artist, title, duration, listened = item
+
+                def intern(s):
+                    if s not in ids:
+                        data = s.encode("utf-8")[:0xFFFF]
+                        strings.write(LENGTH.pack(len(data)) + data)
+                        ids[s] = len(ids)
+                    return ids[s]
+
+                try:
+                    artist_id = intern(artist)
+                    title_id = intern(title)
+                    # Strings must hit the disk before the record that points at them
+                    strings.flush()
+                    records.write(RECORD.pack(int(start), artist_id, title_id,
+                                              min(int(duration), 0xFFFF), min(int(listened), 0xFFFF)))
+                    records.flush()
+                except Exception as e:
+                    print(f"Failed to write listening history: {e}")
+
+# --- Queries ---
+
+def plays_since(records, since):
+    return records[records["start"] >= since]
+
+def top_tracks(records, strings, count=10):
+    """Returns [(artist, title, plays, seconds listened)] sorted by plays."""
+    if len(records) == 0:
+        return []
+    keys = (records["artist"].astype(np.uint64) << np.uint64(32)) | records["title"].astype(np.uint64)
+    uniq, inverse, plays = np.unique(keys, return_inverse=True, return_counts=True)
+    listened = np.bincount(inverse, weights=records["listened"])
+    order = np.lexsort((-listened, -plays))[:count]
+    return [(strings[int(uniq[i] >> np.uint64(32))], strings[int(uniq[i] & np.uint64(0xFFFFFFFF))],
+             int(plays[i]), int(listened[i])) for i in order]
+
+def top_artists(records, strings, count=10):
+    """Returns [(artist, plays, seconds listened)] sorted by plays."""
+    if len(records) == 0:
+        return []
+    plays = np.bincount(records["artist"])
+    listened = np.bincount(records["artist"], weights=records["listened"])
+    order = np.lexsort((-listened, -plays))[:count]
+    return [(strings[i], int(plays[i]), int(listened[i])) for i in order if plays[i] > 0]
+
+def total_listened(records):
+    return int(records["listened"].sum(dtype=np.uint64))
+
+def format_duration(seconds):
+    h, rem = divmod(int(seconds), 3600)
+    return f"{h}h{rem // 60:02d}m"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Listening history statistics.")
+    parser.add_argument("query", choices=["tracks", "artists", "total"], help="What to show")
+    parser.add_argument("--days", type=float, default=7, help="Look back this many days (default: 7)")
+    parser.add_argument("-n", type=int, default=10, help="Number of entries for top lists")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    records = plays_since(load_records(), time.time() - args.days * 86400)
+    strings = load_strings()
+
+    if args.query == "tracks":
+        rows = [f"{plays:4d}x {format_duration(secs):>7}  {artist} - {title}"
+                for artist, title, plays, secs in top_tracks(records, strings, args.n)]
+    elif args.query == "artists":
+        rows = [f"{plays:4d}x {format_duration(secs):>7}  {artist}"
+                for artist, plays, secs in top_artists(records, strings, args.n)]
+    else:
+        rows = [f"{format_duration(total_listened(records))} listened over {len(records)} plays"]
+    took = (time.perf_counter() - start) * 1000
+
+    print(f"Last {args.days:g} days ({took:.1f} ms):")
+    for row in rows:
+        print(row)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
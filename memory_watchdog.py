@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import signal
+import subprocess
+import cProfile
+import pstats
+import io
+import tracemalloc
+from dotenv import load_dotenv
+
+# Configuration (opt-in with PROFILE_MEMORY=1)
+load_dotenv()
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "0") not in ("", "0", "false", "no")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "900"))  # Seconds between tracemalloc snapshots
+RSS_LIMIT_MB = float(os.getenv("RSS_LIMIT_MB", "0"))              # 0 disables the ceiling
+RSS_LIMIT_ACTION = os.getenv("RSS_LIMIT_ACTION", "warn")          # warn or restart
+PROFILE_ITERATIONS = int(os.getenv("PROFILE_ITERATIONS", "60"))   # Loop iterations per cProfile dump
+PROFILE_TRIGGER = os.getenv("PROFILE_TRIGGER", "profile.request") # Touch this file to request a profile
+WATCHDOG_LOG = os.getenv("WATCHDOG_LOG", "watchdog.log")          # pythonw has no console to print to
+TOP_SITES = 10
+TRACE_FRAMES = 5
+
+def get_rss():
+    """Returns the resident set size of this process in bytes, or None if unknown."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def restart_process():
+    """Starts a fresh copy of this process (same interpreter and args) and exits."""
+    print("Restarting...")
+    # Not os.execv: on Windows it does not quote arguments, so paths with spaces break
+    subprocess.Popen([sys.executable] + sys.argv)
+    sys.exit(0)
+
+class MemoryWatchdog:
+    """Opt-in memory and CPU profiling for sessions that run for days.
+
+    Call `tick()` once per loop iteration. Every `SNAPSHOT_INTERVAL` it logs
+    RSS and the allocation sites that grew the most since the first snapshot.
+    A cProfile of the next `PROFILE_ITERATIONS` iterations is dumped when the
+    process gets SIGUSR1 (SIGBREAK / Ctrl+Break on Windows) or when the
+    trigger file appears. Past `RSS_LIMIT_MB` it warns or asks for a restart.
+    """
+
+    def __init__(self, enabled=PROFILE_MEMORY, interval=SNAPSHOT_INTERVAL, rss_limit_mb=RSS_LIMIT_MB,
+                 limit_action=RSS_LIMIT_ACTION, profile_iterations=PROFILE_ITERATIONS):
+        self.enabled = enabled
+        self.interval = interval
+        self.rss_limit = rss_limit_mb * 1024 * 1024
+        self.limit_action = limit_action
+        self.profile_iterations = profile_iterations
+
+        self.baseline = None
+        self.start_rss = None
+        self.last_snapshot = 0
+        self.profile_requested = False
+        self.profiler = None
+        self.profiled = 0
+        self.restart_requested = False
+
+        if not self.enabled:
+            return
+
+        tracemalloc.start(TRACE_FRAMES)
+        self.baseline = tracemalloc.take_snapshot()
+        self.start_rss = get_rss()
+        self.last_snapshot = time.time()
+        self._install_signal()
+        self.log(f"Memory watchdog on (snapshot every {self.interval:.0f} s, "
+                 f"RSS limit {rss_limit_mb:.0f} MB -> {self.limit_action})")
+
+    def _install_signal(self):
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is None:
+            return
+        try:
+            signal.signal(sig, lambda *_: self.request_profile())
+        except ValueError:
+            pass  # Not on the main thread
+
+    def log(self, message):
+        line = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+        print(line)
+        try:
+            with open(WATCHDOG_LOG, "a") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    def request_profile(self):
+        self.profile_requested = True
+
+    def tick(self):
+        """Runs the periodic checks; returns True once a restart has been requested."""
+        if not self.enabled:
+            return False
+
+        if os.path.exists(PROFILE_TRIGGER):
+            os.remove(PROFILE_TRIGGER)
+            self.request_profile()
+        self._profile_step()
+
+        now = time.time()
+        if now - self.last_snapshot >= self.interval:
+            self.last_snapshot = now
+            self.report()
+            self._check_rss()
+        return self.restart_requested
+
+    def report(self):
+        """Logs RSS growth and the top growing allocation sites since startup."""
+        rss = get_rss()
+        if rss is not None and self.start_rss is not None:
+            self.log(f"RSS {rss / 1048576:.1f} MB ({(rss - self.start_rss) / 1048576:+.1f} MB since start)")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        self.log(f"Traced Python memory {current / 1048576:.1f} MB (peak {peak / 1048576:.1f} MB), top growth:")
+        # compare_to() orders by absolute change, a big shrink would hide smaller growth
+        grown = sorted((stat for stat in snapshot.compare_to(self.baseline, "lineno") if stat.size_diff > 0),
+                       key=lambda stat: stat.size_diff, reverse=True)
+        for stat in grown[:TOP_SITES]:
+            frame = stat.traceback[0]
+            self.log(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+6d} blocks  {frame.filename}:{frame.lineno}")
+
+    def _check_rss(self):
+        if not self.rss_limit:
+            return
+        rss = get_rss()
+        if rss is None or rss < self.rss_limit:
+            return
+        if self.limit_action == "restart":
+            self.log(f"RSS {rss / 1048576:.1f} MB over the limit, restarting cleanly.")
+            self.restart_requested = True
+        else:
+            self.log(f"Warning: RSS {rss / 1048576:.1f} MB is over the {self.rss_limit / 1048576:.0f} MB limit.")
+
+    def _profile_step(self):
+        if self.profiler is None:
+            if self.profile_requested:
+                self.profile_requested = False
+                self.log(f"Profiling the next {self.profile_iterations} loop iterations...")
+                self.profiler = cProfile.Profile()
+                self.profiled = 0
+                self.profiler.enable()
+            return
+
+        self.profiled += 1
+        if self.profiled < self.profile_iterations:
+            return
+
+        self.profiler.disable()
+        path = f"profile_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        self.profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(15)
+        self.log(f"Profile saved to {path}:\n{out.getvalue()}")
+        self.profiler = None
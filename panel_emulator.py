@@ -0,0 +1,184 @@
+import io
+import os
+import time
+import random
+from collections import deque
+from PIL import Image, ImageDraw, ImageOps
+from dotenv import load_dotenv
+
+# Configuration (all optional, used when PANEL_EMULATOR=1)
+load_dotenv()
+EMULATOR_ENABLED = os.getenv("PANEL_EMULATOR", "0") not in ("", "0", "false", "no")
+EMU_BANDWIDTH = float(os.getenv("EMU_BANDWIDTH", "2500"))          # Bytes per second over BLE
+EMU_LATENCY = float(os.getenv("EMU_LATENCY", "0.08"))              # Seconds per acknowledged window
+EMU_DISCONNECT_RATE = float(os.getenv("EMU_DISCONNECT_RATE", "0")) # Chance a command drops the link
+EMU_LOSS_RATE = float(os.getenv("EMU_LOSS_RATE", "0"))             # Chance a command is lost
+EMU_SEED = os.getenv("EMU_SEED")
+EMU_FRAME_LOG = int(os.getenv("EMU_FRAME_LOG", "500"))              # Shown frames kept for inspection
+
+PANEL_SIZE = (32, 32)
+WINDOW_SIZE = 12 * 1024  # The real client splits uploads into 12 KB acknowledged windows
+WINDOW_HEADER = 15
+TEXT_BYTES_PER_CHAR = 36  # Rough size of one encoded glyph block
+
+def get_client(mac_address):
+    """Returns the real pypixelcolor client, or the emulator if PANEL_EMULATOR is set."""
+    if EMULATOR_ENABLED:
+        print(f"Using panel emulator instead of {mac_address} "
+              f"({EMU_BANDWIDTH:.0f} B/s, {EMU_LATENCY * 1000:.0f} ms/cmd)")
+        return EmulatedClient(mac_address)
+    import pypixelcolor
+    return pypixelcolor.Client(mac_address)
+
+class EmulatedClient:
+    """Drop-in stand-in for `pypixelcolor.Client` that never touches Bluetooth.
+
+    Commands take as long as they would over a link with the configured
+    bandwidth and latency, and may randomly be lost or drop the connection.
+    The frames that reach the panel are kept in `framebuffer` and `frames`
+    so tests and benchmarks can inspect what would have been shown.
+    """
+
+    def __init__(self, mac_address, bandwidth=EMU_BANDWIDTH, latency=EMU_LATENCY,
+                 disconnect_rate=EMU_DISCONNECT_RATE, loss_rate=EMU_LOSS_RATE, seed=EMU_SEED, realtime=True,
+                 frame_log=EMU_FRAME_LOG):
+        self.mac_address = mac_address
+        # Keeps SlotCache from mixing our slots up with the real device's
+        self.slot_map_key = f"emulator:{mac_address}"
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.disconnect_rate = disconnect_rate
+        self.loss_rate = loss_rate
+        # realtime=False only accounts the link time, handy for fast tests
+        self.realtime = realtime
+        self.random = random.Random(seed)
+
+        self.connected = False
+        self.framebuffer = Image.new('RGB', PANEL_SIZE, (0, 0, 0))
+        self.slots = {}
+        # (timestamp, command, image) for the last `frame_log` frames shown on the panel
+        self.frames = deque(maxlen=frame_log)
+        self.commands = 0
+        self.bytes_sent = 0
+        self.link_time = 0.0
+        self.lost = 0
+        self.disconnects = 0
+
+    # --- Link simulation ---
+
+    def _transfer(self, command, payload_size):
+        """Spends the link time for a command and applies random failures."""
+        if not self.connected:
+            raise RuntimeError("Client not connected. Call connect() first")
+
+        windows = max(1, -(-payload_size // WINDOW_SIZE))
+        size = payload_size + windows * WINDOW_HEADER
+        duration = windows * self.latency + size / self.bandwidth
+        if self.realtime:
+            time.sleep(duration)
+        self.commands += 1
+        self.bytes_sent += size
+        self.link_time += duration
+
+        if self.random.random() < self.disconnect_rate:
+            self.connected = False
+            self.disconnects += 1
+            raise RuntimeError(f"Emulated disconnect during '{command}'")
+        if self.random.random() < self.loss_rate:
+            self.lost += 1
+            raise TimeoutError(f"Emulated packet loss during '{command}'")
+
+    def _show(self, command, img):
+        self.framebuffer = img
+        self.frames.append((time.time(), command, img))
+
+    # --- pypixelcolor.Client API ---
+
+    def connect(self):
+        if self.connected:
+            return
+        if self.realtime:
+            time.sleep(self.latency)
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def send_image(self, path, resize_method='crop', save_slot=0):
+        with open(path, "rb") as f:
+            data = f.read()
+        img = Image.open(io.BytesIO(data))
+        is_gif = getattr(img, "is_animated", False)
+
+        # Like the real client, frames are resized on the host before sending
+        frames = []
+        for i in range(getattr(img, "n_frames", 1) if is_gif else 1):
+            img.seek(i)
+            frames.append(self._fit(img.convert('RGB'), resize_method))
+        if not is_gif and img.size != PANEL_SIZE:
+            buf = io.BytesIO()
+            frames[0].save(buf, format="PNG")
+            data = buf.getvalue()
+
+        self._transfer("send_image", len(data))
+        # Animations are logged frame by frame and rest on their last frame
+        if save_slot:
+            self.slots[int(save_slot)] = frames[-1]
+        for frame in frames:
+            self._show("send_image", frame)
+
+    def send_text(self, text, rainbow_mode=0, animation=0, save_slot=0, speed=80, color="ffffff", bg_color=None, **kwargs):
+        self._transfer("send_text", len(text) * TEXT_BYTES_PER_CHAR)
+        try:
+            fill = (int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16))
+        except:
+            fill = (255, 255, 255)
+        img = Image.new('RGB', PANEL_SIZE, (0, 0, 0))
+        ImageDraw.Draw(img).text((0, 11), text, fill=fill)
+        if save_slot:
+            self.slots[int(save_slot)] = img
+        self._show("send_text", img)
+
+    def show_slot(self, number):
+        self._transfer("show_slot", 7)
+        # An empty slot makes the device cycle through saved ones; keep it simple
+        img = self.slots.get(int(number))
+        if img is not None:
+            self._show("show_slot", img)
+
+    def delete(self, n):
+        self._transfer("delete_slot", 7)
+        self.slots.pop(int(n), None)
+
+    def clear(self):
+        self._transfer("clear", 4)
+        self.slots.clear()
+        self._show("clear", Image.new('RGB', PANEL_SIZE, (0, 0, 0)))
+
+    def _fit(self, img, resize_method):
+        if img.size == PANEL_SIZE:
+            return img
+        if str(getattr(resize_method, "value", resize_method)) == 'fit':
+            return ImageOps.pad(img, PANEL_SIZE, Image.Resampling.LANCZOS, color=(0, 0, 0))
+        return ImageOps.fit(img, PANEL_SIZE, Image.Resampling.LANCZOS)
+
+    # --- Inspection helpers ---
+
+    def dump_png(self, path, scale=8):
+        """Saves the current framebuffer, scaled up so single LEDs are visible."""
+        self.framebuffer.resize((PANEL_SIZE[0] * scale, PANEL_SIZE[1] * scale), Image.Resampling.NEAREST).save(path)
+
+    def dump_gif(self, path, scale=8):
+        """Saves the frame log as an animated GIF, keeping the real timing between frames."""
+        if not self.frames:
+            return
+        size = (PANEL_SIZE[0] * scale, PANEL_SIZE[1] * scale)
+        images = [img.resize(size, Image.Resampling.NEAREST) for _, _, img in self.frames]
+        stamps = [ts for ts, _, _ in self.frames]
+        durations = [max(20, int((b - a) * 1000)) for a, b in zip(stamps, stamps[1:])] + [1000]
+        images[0].save(path, save_all=True, append_images=images[1:], duration=durations, loop=0)
+
+    def stats(self):
+        rate = self.bytes_sent / self.link_time if self.link_time else 0
+        return (f"{self.commands} commands, {self.bytes_sent} bytes, {self.link_time:.2f} s on link "
+                f"({rate:.0f} B/s), {len(self.frames)} frames, {self.lost} lost, {self.disconnects} disconnects")
@@ -1,7 +1,8 @@
-import pypixelcolor
+from panel_emulator import get_client
 from PIL import Image
 import os
 from dotenv import load_dotenv
+from slot_cache import SlotCache
 
 # Configuration
 load_dotenv()
@@ -9,20 +10,18 @@ DEVICE_MAC = os.getenv("DEVICE_MAC", "95:0B:57:BF:8F:8D")
 
 def turn_off_panel():
     print(f"Connecting to {DEVICE_MAC} to turn off...")
-    client = pypixelcolor.Client(DEVICE_MAC)
+    client = get_client(DEVICE_MAC)
+    slots = SlotCache(client, DEVICE_MAC)
     try:
         client.connect()
+        slots.revalidate()
         
         # Create a 32x32 black image
         black_img = Image.new('RGB', (32, 32), color=(0, 0, 0))
-        temp_path = "black_screen.png"
-        black_img.save(temp_path)
         
+        # After the first run the black screen lives in a slot
         print("Sending black screen...")
-        client.send_image(temp_path)
-        
-        # Optionally, we could try to just set black text if that's preferred
-        # or use save_slot if we wanted to persist this.
+        slots.show(black_img, "black_screen.png")
         
         print("Panel turned off (black).")
     except Exception as e:
@@ -1,16 +1,151 @@
-import asyncio
+import io
+import os
+import sys
+import json
 import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont
 import pypixelcolor
-import os
+from panel_emulator import get_client
+from slot_cache import frame_hash
+from weather_pictograms import WEATHER_GROUPS, draw_weather_pictogram
 
 # Configuration
 DEVICE_MAC = "95:0B:57:BF:8F:8D"
+GOLDEN_PATH = "golden_frames.json"
+SHEET_PATH = "pictograms.png"
+UNKNOWN_CODE = 999  # Not a wttr.in code, renders the default cloud
+
+# Sample times on both sides of the 07:00 / 19:00 day-night switch
+SAMPLE_TIMES = ("07:00", "12:34", "18:59", "19:00", "00:00", "06:59")
+SAMPLE_DATE = (2026, 1, 15)  # Fixed winter date, no DST switch
+
+SHEET_SCALE = 4
+LABEL_WIDTH = 96
+HEADER_HEIGHT = 14
+
+# --- Headless batch rendering ---
+
+_clock = None
+
+def render_code(code):
+    """Renders the clock face for one weather code at every sample time (runs in the pool).
+
+    Frames go through CustomClock.render_time, the same path as on the panel.
+    """
+    global _clock
+    from custom_clock import CustomClock
+    with contextlib.redirect_stdout(io.StringIO()):
+        if _clock is None:
+            _clock = CustomClock("00:00:00:00:00:00")
+        _clock.last_weather = str(code)
+        _clock.last_weather_fetch = time.time() + 10 ** 9  # Never hit the network
+        frames = []
+        for sample in SAMPLE_TIMES:
+            h, m = (int(v) for v in sample.split(":"))
+            when = time.mktime(SAMPLE_DATE + (h, m, 0, 0, 0, -1))
+            _clock.render_time("ffffff", when)
+            img = _clock.scene.frame()  # render_time() returns None for an unchanged face
+            frames.append((frame_name(code, sample), img.mode, img.size, img.tobytes()))
+    return frames
+
+def frame_name(code, sample):
+    return f"{code}@{sample}"
+
+def all_codes():
+    return [code for codes in WEATHER_GROUPS.values() for code in codes] + [UNKNOWN_CODE]
+
+def render_all(workers=None):
+    """Returns {frame name: image} for every weather code x sample time."""
+    workers = workers or os.cpu_count() or 1
+    codes = all_codes()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_code, codes, chunksize=max(1, len(codes) // workers)))
+    else:
+        results = [render_code(code) for code in codes]
+    return {name: Image.frombytes(mode, size, data)
+            for frames in results for name, mode, size, data in frames}
+
+def load_golden(path=GOLDEN_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def compare(frames, golden):
+    """Returns the names of frames that differ from, or are missing in, the golden set."""
+    changed = [name for name, img in frames.items() if name in golden and golden[name] != frame_hash(img)]
+    new = [name for name in frames if name not in golden]
+    return changed, new
+
+def contact_sheet(frames, changed=(), new=()):
+    """Lays out all frames, one row per weather code. Changed frames get a red border, new ones yellow."""
+    codes = all_codes()
+    cell = 32 * SHEET_SCALE + 4
+    sheet = Image.new('RGB', (LABEL_WIDTH + cell * len(SAMPLE_TIMES), HEADER_HEIGHT + cell * len(codes)), (24, 24, 24))
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+    groups = {code: name for name, group in WEATHER_GROUPS.items() for code in group}
+
+    for col, sample in enumerate(SAMPLE_TIMES):
+        draw.text((LABEL_WIDTH + col * cell + 4, 1), sample, font=font, fill=(200, 200, 200))
+    for row, code in enumerate(codes):
+        y = HEADER_HEIGHT + row * cell
+        draw.text((4, y + cell // 2 - 10), str(code), font=font, fill=(255, 255, 255))
+        draw.text((4, y + cell // 2 + 2), groups.get(code, "unknown"), font=font, fill=(150, 150, 150))
+        for col, sample in enumerate(SAMPLE_TIMES):
+            name = frame_name(code, sample)
+            x = LABEL_WIDTH + col * cell
+            if name in changed or name in new:
+                draw.rectangle([x, y, x + cell - 1, y + cell - 1], fill=(255, 0, 0) if name in changed else (255, 200, 0))
+            sheet.paste(frames[name].resize((32 * SHEET_SCALE,) * 2, Image.Resampling.NEAREST), (x + 2, y + 2))
+    return sheet
+
+def check(update=False, sheet_path=SHEET_PATH, golden_path=GOLDEN_PATH, workers=None):
+    """Renders every frame, writes the contact sheet and compares against the golden hashes.
+
+    Returns True when all frames match. With `update`, the golden file is rewritten instead.
+    """
+    start = time.perf_counter()
+    frames = render_all(workers)
+    took = time.perf_counter() - start
+    print(f"Rendered {len(frames)} frames ({len(all_codes())} codes x {len(SAMPLE_TIMES)} times) in {took:.2f}s")
+
+    golden = load_golden(golden_path)
+    changed, new = ([], []) if update else compare(frames, golden)
+    if sheet_path:
+        contact_sheet(frames, changed, new).save(sheet_path)
+        print(f"Contact sheet written to {sheet_path}")
+
+    if update:
+        with open(golden_path, "w") as f:
+            json.dump({name: frame_hash(img) for name, img in sorted(frames.items())}, f, indent=1)
+        print(f"Golden frames updated in {golden_path}")
+        return True
+
+    for name in changed:
+        print(f"  CHANGED  {name}")
+    for name in new:
+        print(f"  NEW      {name}")
+    stale = [name for name in golden if name not in frames]
+    if stale:
+        print(f"  {len(stale)} golden frame(s) no longer rendered")
+    if changed or new:
+        print(f"{len(changed)} changed, {len(new)} new frame(s). Rerun with --update if this is intended.")
+        return False
+    print("All frames match the golden set.")
+    return True
+
+# --- Panel preview ---
 
 class WeatherPreview:
     def __init__(self, mac_address):
         self.mac_address = mac_address
-        self.client = pypixelcolor.Client(mac_address)
+        self.client = get_client(mac_address)
         self.is_connected = False
 
     def connect(self):
@@ -22,82 +157,6 @@ class WeatherPreview:
         except Exception as e:
             print(f"Connection failed: {e}")
 
-    def draw_weather_pictogram(self, draw, code, is_night=False):
-        """Draws a highly granular 16x32 weather pictogram on the left side."""
-        # 1. SUNNY / CLEAR
-        if code == 113: 
-            if is_night:
-                draw.ellipse([4, 12, 12, 20], fill=(240, 240, 240))
-                draw.ellipse([7, 10, 15, 18], fill=(0, 0, 0))
-            else:
-                draw.ellipse([5, 13, 11, 19], fill=(255, 200, 0))
-                draw.point([(8, 11), (8, 21), (3, 16), (13, 16)], fill=(255, 180, 0))
-                draw.point([(5, 13), (11, 13), (5, 19), (11, 19)], fill=(255, 150, 0))
-
-        # 2. PARTLY CLOUDY
-        elif code == 116:
-            if is_night:
-                draw.ellipse([7, 11, 13, 17], fill=(200, 200, 200))
-                draw.ellipse([9, 10, 15, 15], fill=(0, 0, 0))
-            else:
-                draw.ellipse([8, 11, 13, 16], fill=(255, 200, 0))
-            draw.ellipse([3, 15, 10, 21], fill=(120, 120, 130) if is_night else (180, 180, 180))
-            draw.ellipse([6, 14, 13, 19], fill=(80, 80, 90) if is_night else (140, 140, 150))
-
-        # 3. CLOUDY / OVERCAST
-        elif code in [119, 122]:
-            if is_night:
-                draw.ellipse([9, 10, 14, 15], fill=(180, 180, 180))
-                draw.ellipse([11, 9, 16, 13], fill=(0, 0, 0))
-            base = (80, 80, 100) if is_night else (160, 160, 170)
-            draw.ellipse([3, 15, 10, 21], fill=base)
-            draw.ellipse([7, 16, 13, 22], fill=(base[0]-20, base[1]-20, base[2]-20))
-            draw.ellipse([5, 13, 11, 18], fill=(base[0]+20, base[1]+20, base[2]+20))
-
-        # 4. FOG / MIST
-        elif code in [143, 248, 260]:
-            if is_night:
-                draw.ellipse([8, 11, 12, 15], fill=(60, 60, 70))
-            col = (80, 80, 100) if is_night else (180, 180, 200)
-            draw.line([(4, 14), (12, 14)], fill=col)
-            draw.line([(3, 17), (11, 17)], fill=col)
-            draw.line([(5, 20), (13, 20)], fill=col)
-
-        # 5. LIGHT RAIN / DRIZZLE
-        elif code in [176, 263, 296, 353]:
-            if is_night:
-                draw.ellipse([9, 9, 14, 14], fill=(150, 150, 160))
-                draw.ellipse([11, 8, 16, 12], fill=(0, 0, 0))
-            draw.ellipse([3, 12, 12, 18], fill=(60, 60, 80) if is_night else (100, 100, 130))
-            draw.point([(6, 20), (10, 21)], fill=(0, 150, 255))
-
-        # 6. HEAVY RAIN
-        elif code in [302, 308, 359]:
-            if is_night:
-                draw.ellipse([9, 8, 13, 12], fill=(100, 100, 110))
-                draw.ellipse([11, 7, 15, 11], fill=(0, 0, 0))
-            draw.ellipse([3, 12, 12, 18], fill=(40, 40, 55) if is_night else (70, 70, 90))
-            for x in [5, 8, 11]: draw.line([(x, 20), (x-1, 23)], fill=(0, 120, 255))
-
-        # 7. SNOW
-        elif code in [332, 338]:
-            if is_night:
-                draw.ellipse([6, 10, 10, 14], fill=(60, 60, 80))
-            draw.point([(8, 12), (4, 15), (12, 15), (8, 18), (4, 21), (12, 21), (8, 24)], fill=(255, 255, 255))
-
-        # 8. SLEET / ICE
-        elif code in [317, 350]:
-            if is_night:
-                draw.ellipse([8, 9, 12, 13], fill=(100, 100, 120))
-            draw.ellipse([4, 12, 11, 17], fill=(120, 120, 150) if is_night else (150, 150, 180))
-            draw.point([(6, 19), (10, 20)], fill=(180, 180, 230)) 
-            draw.point([(8, 22)], fill=(0, 150, 255)) 
-
-        # 9. THUNDER
-        elif code in [389]:
-            draw.ellipse([3, 12, 12, 18], fill=(30, 30, 40) if is_night else (60, 60, 70))
-            draw.line([(8, 19), (6, 22), (10, 22), (8, 26)], fill=(255, 255, 0))
-
     def preview(self):
         self.connect()
         if not self.is_connected: return
@@ -134,11 +193,11 @@ class WeatherPreview:
             for code, night, name in scenarios:
                 img = Image.new('RGB', (32, 32), (0, 0, 0))
                 draw = ImageDraw.Draw(img)
-                self.draw_weather_pictogram(draw, code, night)
-                
+                draw_weather_pictogram(draw, code, night)
+
                 # Add label
                 draw.text((16, 11), name, font=font, fill=(255, 255, 255))
-                
+
                 img.save("preview.png")
                 self.client.send_image("preview.png")
                 print(f"Displaying: {name}")
@@ -147,5 +206,19 @@ class WeatherPreview:
             self.client.disconnect()
             if os.path.exists("preview.png"): os.remove("preview.png")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every weather clock frame against golden hashes, without a panel.")
+    parser.add_argument("--update", action="store_true", help="Record the current frames as the golden set")
+    parser.add_argument("--sheet", default=SHEET_PATH, help="Contact sheet output path ('' to skip)")
+    parser.add_argument("--workers", type=int, help="Render processes (default: one per CPU)")
+    parser.add_argument("--panel", action="store_true", help="Cycle the pictograms on the real panel instead")
+    args = parser.parse_args(argv)
+
+    if args.panel:
+        WeatherPreview(DEVICE_MAC).preview()
+        return
+    if not check(update=args.update, sheet_path=args.sheet, workers=args.workers):
+        sys.exit(1)
+
 if __name__ == "__main__":
-    WeatherPreview(DEVICE_MAC).preview()
+    main(sys.argv[1:])
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from dotenv import load_dotenv
+from calibration import load_calibration
+
+# Configuration
+load_dotenv()
+SLOT_MAP_PATH = os.getenv("SLOT_MAP", "slot_map.json")
+FIRST_SLOT = 1
+LAST_SLOT = 10  # The panel exposes save slots 1-10
+LINK_RATE_SMOOTHING = 0.3
+
+def frame_hash(img):
+    """Returns a stable hash of the pixels of a PIL image."""
+    h = hashlib.sha1()
+    h.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+def save_gif(frames, durations, path, loop=0):
+    """Saves frames as an animated GIF; `loop=None` writes no loop extension, so it plays once."""
+    kwargs = {} if loop is None else {"loop": loop}
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=durations, **kwargs)
+
+class SlotCache:
+    """Keeps frequently shown frames in the panel's save slots.
+
+    The local map records which frame hash lives in which slot. It is shared
+    between scripts through a small JSON file, since they all write to the
+    same device. Showing a cached frame is a single `show_slot` command
+    instead of a full image upload.
+    """
+
+    def __init__(self, client, mac_address, first_slot=FIRST_SLOT, last_slot=LAST_SLOT, map_path=SLOT_MAP_PATH):
+        self.client = client
+        self.mac_address = getattr(client, "slot_map_key", mac_address)
+        # Color correction for this panel, applied right before frames are sent
+        self.calibration = load_calibration(mac_address)
+        self.slots = list(range(first_slot, last_slot + 1))
+        self.map_path = map_path
+        # frame hash -> slot, least recently used first
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.link_rate = None  # Measured upload bytes/s, None until the first upload
+        self.load()
+
+    def load(self):
+        """Loads the slot map written for this device, if any."""
+        self.entries.clear()
+        stored = self._read_map_file().get(self.mac_address, [])
+        for frame_id, slot in stored:
+            if slot in self.slots:
+                self.entries[frame_id] = slot
+
+    def save(self, lost_slot=None):
+        data = self._read_map_file()
+        # Keep slots other scripts own, ours win where they overlap
+        ours = set(self.entries.values())
+        if lost_slot is not None:
+            ours.add(lost_slot)
+        others = [[frame_id, slot] for frame_id, slot in data.get(self.mac_address, []) if slot not in ours and frame_id not in self.entries]
+        data[self.mac_address] = others + [[frame_id, slot] for frame_id, slot in self.entries.items()]
+        try:
+            tmp_path = self.map_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.map_path)
+        except Exception as e:
+            print(f"Failed to save slot map: {e}")
+
+    def _read_map_file(self):
+        try:
+            with open(self.map_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def revalidate(self):
+        """Re-checks the local map after a (re)connect.
+
+        Another script may have written to the panel while we were away, so
+        entries whose slot is now claimed by a different frame are dropped.
+        """
+        stored = {slot: frame_id for frame_id, slot in self._read_map_file().get(self.mac_address, [])}
+        stale = [frame_id for frame_id, slot in self.entries.items() if stored.get(slot) != frame_id]
+        # The emulator can tell exactly which slots hold something
+        device_slots = getattr(self.client, "slots", None)
+        if isinstance(device_slots, dict):
+            stale += [frame_id for frame_id, slot in self.entries.items() if slot not in device_slots and frame_id not in stale]
+        for frame_id in stale:
+            del self.entries[frame_id]
+        if stale:
+            print(f"Slot cache: dropped {len(stale)} stale slot(s) after reconnect.")
+
+    def _take_slot(self):
+        """Returns a free slot, evicting the least recently used frame if needed."""
+        used = set(self.entries.values())
+        for slot in self.slots:
+            if slot not in used:
+                return slot
+        _, slot = self.entries.popitem(last=False)
+        return slot
+
+    def show(self, img, temp_path, resize_method=None):
+        """Shows a PIL image, switching to its slot if it is already on the panel."""
+        img = self.calibration.apply(img)
+        return self._show(frame_hash(img), lambda: img.save(temp_path), temp_path, resize_method)
+
+    def show_animation(self, frames, durations, temp_path, loop=0):
+        """Shows a sequence of frames as one animated GIF upload (or slot switch).
+
+        `loop=None` plays the animation once and leaves its last frame up.
+        """
+        frames = [self.calibration.apply(img) for img in frames]
+        h = hashlib.sha1()
+        for img, duration in zip(frames, durations):
+            h.update(frame_hash(img).encode())
+            h.update(str(duration).encode())
+        h.update(str(loop).encode())
+        return self._show(h.hexdigest(), lambda: save_gif(frames, durations, temp_path, loop), temp_path)
+
+    def play_once(self, frames, durations, temp_path):
+        """Uploads frames as a GIF that plays once, without a slot.
+
+        For one-off animations (transitions): they never evict cached frames
+        and the panel does not replay them.
+        """
+        save_gif([self.calibration.apply(img) for img in frames], durations, temp_path, None)
+        self._send(temp_path)
+
+    def gif_exact(self, img):
+        """True if the frame survives GIF encoding unchanged (256 colors or fewer after calibration)."""
+        return self.calibration.apply(img).getcolors(256) is not None
+
+    def _show(self, frame_id, save, temp_path, resize_method=None):
+        slot = self.entries.get(frame_id)
+        if slot is not None:
+            try:
+                self.client.show_slot(slot)
+                self.entries.move_to_end(frame_id)
+                self.hits += 1
+                return True
+            except Exception as e:
+                print(f"Slot switch failed, re-uploading: {e}")
+                del self.entries[frame_id]
+
+        slot = self._take_slot()
+        save()
+        kwargs = {"save_slot": slot}
+        if resize_method:
+            kwargs["resize_method"] = resize_method
+        try:
+            self._send(temp_path, **kwargs)
+        except Exception as e:
+            # The slot content is unknown now, make sure nobody trusts it
+            self.save(lost_slot=slot)
+            raise e
+        self.entries[frame_id] = slot
+        self.misses += 1
+        self.save()
+        return False
+
+    def _send(self, temp_path, **kwargs):
+        """Uploads a file and feeds the time it spent on the link into `link_rate`."""
+        # The emulator accounts link time even when it does not sleep, prefer that
+        link_time = getattr(self.client, "link_time", None)
+        start = time.time()
+        self.client.send_image(temp_path, **kwargs)
+        if link_time is not None:
+            took = self.client.link_time - link_time
+        else:
+            took = time.time() - start
+        self._measure_link(os.path.getsize(temp_path), took)
+
+    def _measure_link(self, size, took):
+        """Keeps a running estimate of upload throughput in bytes per second."""
+        if took <= 0:
+            return
+        rate = size / took
+        if self.link_rate is None:
+            self.link_rate = rate
+        else:
+            self.link_rate += LINK_RATE_SMOOTHING * (rate - self.link_rate)
@@ -0,0 +1,5 @@
+@echo off
+cd /d "%~dp0"
+echo Starting Ambilight...
+python ambilight.py
+pause
@@ -5,27 +5,41 @@ import win32gui
 import win32process
 import win32api
 import win32con
-from PIL import Image, ImageWin
-import pypixelcolor
+from PIL import ImageWin
+from panel_emulator import get_client
 from dotenv import load_dotenv
+from slot_cache import SlotCache
+from image_worker import ImagePool, StallMonitor, postprocess_icon
+from artwork_overrides import ArtworkOverrides
 
 # Configuration
 load_dotenv()
 DEVICE_MAC = os.getenv("DEVICE_MAC", "95:0B:57:BF:8F:8D")
 CHECK_INTERVAL = 2  # Seconds between window checks
+OVERRIDE_RELOAD_INTERVAL = 10  # Seconds between artwork.json change checks
 
 class GameSyncApp:
     def __init__(self, mac_address):
         self.mac_address = mac_address
-        self.client = pypixelcolor.Client(mac_address)
+        self.client = get_client(mac_address)
+        self.slots = SlotCache(self.client, mac_address)
         self.is_connected = False
         self.last_exe_path = None
 
+        # Icon post-processing runs in worker processes, off the event loop
+        self.pool = ImagePool()
+        self.stall_monitor = StallMonitor()
+
+        # Custom artwork per exe, decoded once and looked up before icon extraction
+        self.overrides = ArtworkOverrides()
+        self.last_override_check = time.time()
+
     async def connect(self):
         print(f"Connecting to LED panel at {self.mac_address}...")
         try:
             self.client.connect()
             self.is_connected = True
+            self.slots.revalidate()
             print("Connected successfully!")
         except Exception as e:
             print(f"Failed to connect: {e}")
@@ -46,15 +60,15 @@ class GameSyncApp:
         except Exception:
             return None
 
-    def extract_icon(self, exe_path, output_path="game_icon.png"):
-        """Extracts the icon from an EXE and saves it as a 32x32 PNG."""
+    async def extract_icon(self, exe_path):
+        """Extracts the icon from an EXE and returns it as a 32x32 panel frame."""
         try:
             # Get small and large icons
             # We want the large one for better resizing results
             large, small = win32gui.ExtractIconEx(exe_path, 0)
             
             if not large:
-                return False
+                return None
             
             # Use the first large icon
             hicon = large[0]
@@ -88,24 +102,31 @@ class GameSyncApp:
             win32gui.DestroyIcon(hicon)
             win32gui.DeleteObject(hbmp)
             
-            # Open with PIL
-            img = Image.open(temp_bmp)
-            img = img.convert("RGBA")
+            with open(temp_bmp, "rb") as f:
+                data = f.read()
             if os.path.exists(temp_bmp):
                 os.remove(temp_bmp)
             
-            # Final touch with PIL
-            img = img.resize((32, 32), Image.Resampling.LANCZOS)
-            
-            # Background should be black for LED panel
-            bg = Image.new("RGB", (32, 32), (0, 0, 0))
-            bg.paste(img, (0, 0), img)
-            bg.save(output_path)
-            
-            return True
+            # Resize and flatten onto black (LED panel background) in the pool
+            return await self.pool.submit("icon", postprocess_icon, data)
         except Exception as e:
             print(f"Icon extraction failed: {e}")
-            return False
+            return None
+
+    def show_override(self, art):
+        if art.animated:
+            self.slots.show_animation(art.frames, art.durations, "game_icon.gif")
+        else:
+            self.slots.show(art.frames[0], "game_icon.png")
+
+    def check_overrides(self):
+        """Picks up artwork.json edits; forces the current app to be shown again if it changed."""
+        now = time.time()
+        if now - self.last_override_check < OVERRIDE_RELOAD_INTERVAL:
+            return
+        self.last_override_check = now
+        if self.overrides.reload():
+            self.last_exe_path = None
 
     async def run(self):
         await self.connect()
@@ -113,9 +134,11 @@ class GameSyncApp:
             return
 
         print("Monitoring active games/apps... Press Ctrl+C to stop.")
+        stall_task = asyncio.create_task(self.stall_monitor.run())
         
         try:
             while True:
+                self.check_overrides()
                 exe_path = self.get_foreground_exe()
                 
                 # Basic filter: ignore system apps
@@ -124,16 +147,27 @@ class GameSyncApp:
                     if exe_path != self.last_exe_path:
                         app_name = os.path.basename(exe_path)
                         print(f"Detected Active App: {app_name}")
-                        
-                        if self.extract_icon(exe_path):
-                            print(f"Sending icon to panel...")
-                            self.client.send_image("game_icon.png", resize_method='crop')
+
+                        art = self.overrides.lookup(exe_path)
+                        if art:
+                            # Custom artwork is already decoded, no icon extraction needed
+                            print(f"Sending custom artwork to panel...")
+                            self.show_override(art)
                             self.last_exe_path = exe_path
+                        else:
+                            icon = await self.extract_icon(exe_path)
+                            if icon:
+                                print(f"Sending icon to panel...")
+                                self.slots.show(icon, "game_icon.png")
+                                self.last_exe_path = exe_path
                 
                 await asyncio.sleep(CHECK_INTERVAL)
         except KeyboardInterrupt:
             print("Stopping...")
         finally:
+            stall_task.cancel()
+            self.stall_monitor.report()
+            self.pool.shutdown()
             if self.is_connected:
                 self.client.disconnect()
 
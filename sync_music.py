@@ -1,13 +1,22 @@
 import asyncio
-import io
 import time
 import os
 import requests
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw, ImageFont
 import pypixelcolor
+from panel_emulator import get_client
 from winrt.windows.media.control import GlobalSystemMediaTransportControlsSessionManager as SessionManager, GlobalSystemMediaTransportControlsSessionPlaybackStatus as PlaybackStatus
 from winrt.windows.storage.streams import DataReader, Buffer
 from dotenv import load_dotenv
+from slot_cache import SlotCache
+from clock_scheduler import ClockScheduler
+from compositor import Scene, paint_background
+from weather_pictograms import draw_weather_pictogram, is_night
+from image_worker import ImagePool, StallMonitor, decode_cover
+from color_theme import accent_color
+from transitions import TransitionRenderer
+from memory_watchdog import MemoryWatchdog, restart_process
+from listening_history import ListeningHistory
 
 # Load configuration
 load_dotenv()
@@ -17,20 +26,56 @@ LOCATION = os.getenv("LOCATION", "Strasbourg")
 CHECK_INTERVAL = 1  # Seconds between checks
 MUSIC_DURATION = 25  # Default music duration
 CLOCK_DURATION = 5   # Seconds to show clock
+TRACK_COLOR_CACHE = 500  # Tracks whose cover color we remember
 
 class MusicSyncApp:
     def __init__(self, mac_address):
         self.mac_address = mac_address
-        self.client = pypixelcolor.Client(mac_address)
+        self.client = get_client(mac_address)
+        self.slots = SlotCache(self.client, mac_address)
+        self.clock = ClockScheduler(lambda when: self.render_custom_clock(when=when), self.send_clock_frame)
         self.current_track_id = None
         self.current_track_name = None
         self.current_thumbnail_ref = None
         self.is_connected = False
+
+        # Cover decoding runs in worker processes, off the event loop
+        self.pool = ImagePool()
+        self.cover_job = None
+        self.stall_monitor = StallMonitor()
+
+        # Accent color of each track's cover, used to tint the clock and titles
+        self.track_colors = {}
+
+        # Last frame we put on the panel (None after text), for transitions
+        self.last_frame = None
+        self.transitions = TransitionRenderer(self.slots)
+
+        # Opt-in leak/profiling watchdog (PROFILE_MEMORY=1)
+        self.watchdog = MemoryWatchdog()
+
+        # Listening history: (start, artist, title, duration) of the current play
+        self.history = ListeningHistory()
+        self.play = None
+        self.listened = 0
+        self.last_poll = time.time()
         self.is_paused = False
         
         # Weather tracking
         self.last_weather = None
         self.last_weather_fetch = 0
+
+        # Clock face layers: background, weather tile, hour and minute digits,
+        # and an overlay with the track progress while music plays
+        self.font = None
+        self.scene = Scene()
+        self.scene.add_layer("background", (0, 0, 32, 32))
+        self.scene.add_layer("weather", (0, 0, 17, 32))
+        self.scene.add_layer("hours", (16, 0, 32, 15))
+        self.scene.add_layer("minutes", (16, 15, 32, 32))
+        self.scene.add_layer("overlay", (0, 31, 32, 32))
+        self.scene.update("background", (0, 0, 0), paint_background)
+        self.clock_frame = None  # Last clock frame produced, to tell if it is still on the panel
         
         # Tracking which parts of the song we've shown the title for
         self.shown_phases = set() # "START", "MIDDLE", "END"
@@ -40,6 +85,7 @@ class MusicSyncApp:
         try:
             self.client.connect()
             self.is_connected = True
+            self.slots.revalidate()
             print("Connected successfully!")
         except Exception as e:
             print(f"Failed to connect: {e}")
@@ -75,105 +121,12 @@ class MusicSyncApp:
         self.last_weather_fetch = now
         return self.last_weather
 
-    def draw_weather_pictogram(self, draw, code):
-        """Draws a highly granular 16x32 weather pictogram on the left side."""
-        code = int(code) if code else 113
-        hour = int(time.strftime("%H"))
-        is_night = hour >= 19 or hour < 7
-
-        # 1. SUNNY / CLEAR
-        if code == 113: 
-            if is_night:
-                # Moon
-                draw.ellipse([4, 12, 12, 20], fill=(240, 240, 240))
-                draw.ellipse([7, 10, 15, 18], fill=(0, 0, 0))
-            else:
-                # Sun
-                draw.ellipse([5, 13, 11, 19], fill=(255, 200, 0))
-                draw.point([(8, 11), (8, 21), (3, 16), (13, 16)], fill=(255, 180, 0))
-                draw.point([(5, 13), (11, 13), (5, 19), (11, 19)], fill=(255, 150, 0))
-
-        # 2. PARTLY CLOUDY
-        elif code == 116:
-            if is_night:
-                # Small Moon behind cloud
-                draw.ellipse([7, 11, 13, 17], fill=(200, 200, 200))
-                draw.ellipse([9, 10, 15, 15], fill=(0, 0, 0))
-            else:
-                # Small Sun behind cloud
-                draw.ellipse([8, 11, 13, 16], fill=(255, 200, 0))
-            # Cloud
-            draw.ellipse([3, 15, 10, 21], fill=(120, 120, 130) if is_night else (180, 180, 180))
-            draw.ellipse([6, 14, 13, 19], fill=(80, 80, 90) if is_night else (140, 140, 150))
-
-        # 3. CLOUDY / OVERCAST
-        elif code in [119, 122]:
-            if is_night:
-                # Tiny moon peeking from top-right
-                draw.ellipse([9, 10, 14, 15], fill=(180, 180, 180))
-                draw.ellipse([11, 9, 16, 13], fill=(0, 0, 0))
-            base = (80, 80, 100) if is_night else (160, 160, 170)
-            draw.ellipse([3, 15, 10, 21], fill=base)
-            draw.ellipse([7, 16, 13, 22], fill=(base[0]-20, base[1]-20, base[2]-20))
-            draw.ellipse([5, 13, 11, 18], fill=(base[0]+20, base[1]+20, base[2]+20))
-
-        # 4. FOG / MIST
-        elif code in [143, 248, 260]:
-            if is_night:
-                # Very faint moon glow behind fog
-                draw.ellipse([8, 11, 12, 15], fill=(60, 60, 70))
-            col = (80, 80, 100) if is_night else (180, 180, 200)
-            draw.line([(4, 14), (12, 14)], fill=col)
-            draw.line([(3, 17), (11, 17)], fill=col)
-            draw.line([(5, 20), (13, 20)], fill=col)
-
-        # 5. LIGHT RAIN / DRIZZLE
-        elif code in [176, 263, 266, 293, 296, 353]:
-            if is_night:
-                # Small moon behind rain cloud
-                draw.ellipse([9, 9, 14, 14], fill=(150, 150, 160))
-                draw.ellipse([11, 8, 16, 12], fill=(0, 0, 0))
-            draw.ellipse([3, 12, 12, 18], fill=(60, 60, 80) if is_night else (100, 100, 130))
-            draw.point([(6, 20), (10, 21)], fill=(0, 150, 255))
-
-        # 6. HEAVY RAIN
-        elif code in [299, 302, 305, 308, 356, 359]:
-            if is_night:
-                # Tiny moon behind storm cloud
-                draw.ellipse([9, 8, 13, 12], fill=(100, 100, 110))
-                draw.ellipse([11, 7, 15, 11], fill=(0, 0, 0))
-            draw.ellipse([3, 12, 12, 18], fill=(40, 40, 55) if is_night else (70, 70, 90))
-            for x in [5, 8, 11]: draw.line([(x, 20), (x-1, 23)], fill=(0, 120, 255))
-
-        # 7. SNOW
-        elif code in [179, 227, 230, 323, 326, 329, 332, 335, 338, 368, 371]:
-            if is_night:
-                # Soft glow behind snow
-                draw.ellipse([6, 10, 10, 14], fill=(60, 60, 80))
-            draw.point([(8, 12), (4, 15), (12, 15), (8, 18), (4, 21), (12, 21), (8, 24)], fill=(255, 255, 255))
-
-        # 8. SLEET / ICE PELLETS
-        elif code in [182, 185, 281, 284, 311, 314, 317, 320, 350, 362, 365, 374, 377]:
-            if is_night:
-                draw.ellipse([8, 9, 12, 13], fill=(100, 100, 120))
-            draw.ellipse([4, 12, 11, 17], fill=(120, 120, 150) if is_night else (150, 150, 180))
-            draw.point([(6, 19), (10, 20)], fill=(180, 180, 230)) # Ice
-            draw.point([(8, 22)], fill=(0, 150, 255)) # Rain
-
-        # 9. THUNDER
-        elif code in [200, 386, 389, 392, 395]:
-            draw.ellipse([3, 12, 12, 18], fill=(30, 30, 40) if is_night else (60, 60, 70))
-            draw.line([(8, 19), (6, 22), (10, 22), (8, 26)], fill=(255, 255, 0))
-        
-        else: # Default
-            draw.ellipse([3, 14, 13, 20], fill=(100, 100, 100) if is_night else (120, 120, 120))
-
     async def get_current_media_info(self):
         try:
             sessions = await SessionManager.request_async()
             current_session = sessions.get_current_session()
             if not current_session:
-                return None, None, PlaybackStatus.CLOSED, None, 0, 0
+                return None, None, PlaybackStatus.CLOSED, None, 0, 0, None
 
             properties = await current_session.try_get_media_properties_async()
             playback_info = current_session.get_playback_info()
@@ -184,16 +137,19 @@ class MusicSyncApp:
             position = timeline.position.total_seconds()
 
             if not properties:
-                return None, None, status, None, position, duration
+                return None, None, status, None, position, duration, None
 
             # Create a unique ID for the track to avoid redundant updates
             track_id = f"{properties.artist} - {properties.title}"
-            return track_id, properties.thumbnail, status, properties.title, position, duration
+            return track_id, properties.thumbnail, status, properties.title, position, duration, properties.artist
         except Exception as e:
             # print(f"Error getting media info: {e}")
-            return None, None, PlaybackStatus.CLOSED, None, 0, 0
+            return None, None, PlaybackStatus.CLOSED, None, 0, 0, None
 
-    async def process_and_send_thumbnail(self, thumbnail_stream_ref):
+    async def prepare_thumbnail(self, thumbnail_stream_ref):
+        """Reads the cover bytes and queues the decode, replacing any previous track's job."""
+        self.pool.cancel("cover")
+        self.cover_job = None
         if not thumbnail_stream_ref:
             return
 
@@ -211,35 +167,65 @@ class MusicSyncApp:
             data = bytearray(size)
             reader.read_bytes(data)
             
-            # Process with Pillow
-            img = Image.open(io.BytesIO(data))
+            # Decode and crop to 32x32 in the pool
+            self.cover_job = self.pool.submit("cover", decode_cover, bytes(data))
             
-            # Save to temporary file
-            temp_path = "current_album.png"
-            img.save(temp_path)
+        except Exception as e:
+            print(f"Error reading thumbnail: {e}")
+
+    async def send_thumbnail(self):
+        """Sends the current track's cover once its decode is ready."""
+        if not self.cover_job:
+            return
+
+        try:
+            img = await self.cover_job
             
-            print(f"Sending album cover to panel...")
-            self.client.send_image(temp_path, resize_method='crop')
-            print("Update sent!")
+            # Cached covers are a slot switch, new ones a full upload
+            if self.show_frame(img, "current_album.png"):
+                print("Album cover shown from panel slot.")
+            else:
+                print("Album cover sent to panel!")
             
+        except asyncio.CancelledError:
+            print("Album cover decode was superseded.")
         except Exception as e:
             print(f"Error processing thumbnail: {e}")
 
-    def show_custom_clock(self, color="ffffff"):
-        """Generates and sends a split weather/clock image (Weather on left, Vertical Clock on right)."""
+    async def track_color(self):
+        """Returns the current track's accent color, extracting it once per track."""
+        color = self.track_colors.get(self.current_track_id)
+        if color:
+            return color
+        if not self.cover_job:
+            return "ffffff"
+
+        try:
+            color = accent_color(await self.cover_job)
+        except (asyncio.CancelledError, Exception):
+            return "ffffff"
+
+        if len(self.track_colors) >= TRACK_COLOR_CACHE:
+            del self.track_colors[next(iter(self.track_colors))]
+        self.track_colors[self.current_track_id] = color
+        print(f"Track color: #{color}")
+        return color
+
+    def render_custom_clock(self, color="ffffff", when=None, progress=None):
+        """Generates a split weather/clock image (Weather on left, Vertical Clock on right) for `when`.
+
+        The clock face is kept as layers, so only the parts that changed since
+        the last render (usually just the minutes) are redrawn. `progress`
+        (0-1) adds a track progress line on the bottom row. Returns None when
+        the panel already shows exactly this face.
+        """
         # 1. Fetch data
         weather_code = self.fetch_weather()
-        h = time.strftime("%H")
-        m = time.strftime("%M")
+        night = is_night(when)
+        h = time.strftime("%H", time.localtime(when))
+        m = time.strftime("%M", time.localtime(when))
         
-        # 2. Setup drawing
-        img = Image.new('RGB', (32, 32), color=(0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        # 3. Draw Weather on Left (0-15)
-        self.draw_weather_pictogram(draw, weather_code)
-        
-        # 4. Draw Clock on Right (16-31)
+        # 2. Parse color and font
         try:
             r = int(color[0:2], 16)
             g = int(color[2:4], 16)
@@ -248,36 +234,91 @@ class MusicSyncApp:
         except:
             text_color = (255, 255, 255)
 
+        font = self.load_font()
+        
+        # 3. Weather on Left (0-15, the moon cutouts touch x=16)
+        self.scene.update("weather", (weather_code, night),
+                          lambda tile, origin: draw_weather_pictogram(ImageDraw.Draw(tile), weather_code, night))
+        
+        # 4. Clock on Right (16-31)
+        # Shifting minutes up to 15 to reduce the gap
+        self.scene.update("hours", (h, text_color),
+                          lambda tile, origin: self.draw_digits(tile, origin, h, 2, 2, font, text_color))
+        self.scene.update("minutes", (m, text_color),
+                          lambda tile, origin: self.draw_digits(tile, origin, m, 15, 17, font, text_color))
+
+        # 5. Track progress overlay (bottom row, free on every pictogram)
+        self.scene.set_visible("overlay", progress is not None)
+        if progress is not None:
+            width = round(max(0.0, min(1.0, progress)) * 32)
+            dim = tuple(c // 2 for c in text_color)
+            self.scene.update("overlay", (width, dim),
+                              lambda tile, origin: ImageDraw.Draw(tile).line([(0, 0), (width - 1, 0)], fill=dim) if width else None)
+
+        frame = self.scene.produce()
+        if frame is None and self.last_frame is not self.clock_frame:
+            # The face is unchanged, but something else is on the panel now
+            frame = self.scene.frame()
+        if frame is not None:
+            self.clock_frame = frame
+            print(f"Rendered weather clock: {h}/{m} (Weather: {weather_code}, Color: #{color})")
+        return frame
+
+    def load_font(self):
+        if self.font is None:
+            try:
+                font_path = os.path.join(pypixelcolor.__path__[0], 'fonts', 'VCR_OSD_MONO.ttf')
+                self.font = ImageFont.truetype(font_path, 15)
+            except:
+                self.font = ImageFont.load_default()
+        return self.font
+
+    def draw_digits(self, tile, origin, text, y, fallback_y, font, text_color):
+        """Draws two clock digits centered in the right half, at panel row `y`."""
+        draw = ImageDraw.Draw(tile)
         try:
-            font_path = os.path.join(pypixelcolor.__path__[0], 'fonts', 'VCR_OSD_MONO.ttf')
-            font = ImageFont.truetype(font_path, 15)
-        except:
-            font = ImageFont.load_default()
-
-        try:
-            h_bbox = draw.textbbox((0, 0), h, font=font)
-            m_bbox = draw.textbbox((0, 0), m, font=font)
-            h_w = h_bbox[2] - h_bbox[0]
-            m_w = m_bbox[2] - m_bbox[0]
-            
+            bbox = draw.textbbox((0, 0), text, font=font)
+            w = bbox[2] - bbox[0]
             # Position inside right half (16-30 to leave 1px border on right)
             # Center of right half is x = 16 + (15 - width) // 2
-            # Shifting minutes up to 15 to reduce the gap
-            draw.text(((16 + (15 - h_w) // 2), 2), h, font=font, fill=text_color)
-            draw.text(((16 + (15 - m_w) // 2), 15), m, font=font, fill=text_color)
+            draw.text((16 + (15 - w) // 2 - origin[0], y - origin[1]), text, font=font, fill=text_color)
         except:
-            draw.text((18, 2), h, fill=text_color)
-            draw.text((18, 17), m, fill=text_color)
-        
-        temp_path = "clock_weather.png"
-        img.save(temp_path)
-        
-        print(f"Showing weather clock: {h}/{m} (Weather: {weather_code}, Color: #{color})")
+            draw.text((18 - origin[0], fallback_y - origin[1]), text, fill=text_color)
+
+    def send_clock_frame(self, img):
+        self.show_frame(img, "clock_weather.png")
+
+    def show_frame(self, img, temp_path):
+        """Shows a frame, through a transition from the previous one if enabled."""
+        cached = self.transitions.show(self.last_frame, img, temp_path)
+        self.last_frame = img
+        return cached
+
+    async def show_title(self, name):
         try:
-            self.client.send_image(temp_path)
+            self.client.send_text(name, animation=1, speed=100, color=self.slots.calibration.apply_hex(await self.track_color()))
+        except: pass
+        self.last_frame = None
+        self.transitions.cancel()
+
+    def show_custom_clock(self, color="ffffff", progress=None):
+        """Generates and sends the weather clock for the current minute."""
+        img = self.render_custom_clock(color, progress=progress)
+        if img is None:
+            return
+        try:
+            self.send_clock_frame(img)
         except Exception as e:
             print(f"Failed to show weather clock: {e}")
 
+    def finish_play(self):
+        """Queues the current play for the history log (written off the loop)."""
+        if self.play:
+            start, artist, title, duration = self.play
+            self.history.record(start, artist, title, duration, self.listened)
+        self.play = None
+        self.listened = 0
+
     def calculate_text_duration(self, text):
         return max(10, len(text) * 0.35 + 3)
 
@@ -287,6 +328,7 @@ class MusicSyncApp:
             return
 
         print("Monitoring music playback... Press Ctrl+C to stop.")
+        stall_task = asyncio.create_task(self.stall_monitor.run())
         
         last_switch_time = time.time()
         current_title_duration = 5
@@ -294,28 +336,41 @@ class MusicSyncApp:
         
         try:
             while True:
+                if self.watchdog.tick():
+                    break
+                try:
+                    self.transitions.flush()  # Exact frame after a transition, once it has played
+                except Exception as e:
+                    print(f"Failed to land transition frame: {e}")
                 current_time = time.time()
                 
                 # 1. Check for track changes and playback status
-                track_id, thumbnail_ref, status, track_name, position, duration = await self.get_current_media_info()
+                track_id, thumbnail_ref, status, track_name, position, duration, artist = await self.get_current_media_info()
                 is_playing = (status == PlaybackStatus.PLAYING)
+
+                # Count listening time for the history (capped in case we were suspended)
+                if is_playing and self.play:
+                    self.listened += min(current_time - self.last_poll, 5 * CHECK_INTERVAL)
+                self.last_poll = current_time
                 
                 # Update track if changed
                 if track_id and track_id != self.current_track_id:
                     print(f"Track Change Detected: {track_id}")
                     self.current_track_id = track_id
                     self.current_track_name = track_name
+                    self.finish_play()
+                    self.play = (current_time, artist, track_name, duration)
                     self.current_thumbnail_ref = thumbnail_ref
                     self.shown_phases = {"START"} # Reset phases for new track
                     
                     # Update local color and art immediately
-                    await self.process_and_send_thumbnail(thumbnail_ref)
+                    await self.prepare_thumbnail(thumbnail_ref)
+                    if not is_playing:
+                        await self.send_thumbnail()
                     
                     if is_playing:
                         print(f"Showing Title (Start): {track_name}")
-                        try:
-                            self.client.send_text(track_name, animation=1, speed=100)
-                        except: pass
+                        await self.show_title(track_name)
                         mode = "TITLE"
                         current_title_duration = self.calculate_text_duration(track_name)
                         last_switch_time = current_time
@@ -328,8 +383,7 @@ class MusicSyncApp:
                     if 0.48 < progress < 0.52 and "MIDDLE" not in self.shown_phases:
                         print(f"Showing Title (Middle): {track_name}")
                         self.shown_phases.add("MIDDLE")
-                        try: self.client.send_text(track_name, animation=1, speed=100)
-                        except: pass
+                        await self.show_title(track_name)
                         mode = "TITLE"
                         current_title_duration = self.calculate_text_duration(track_name)
                         last_switch_time = current_time
@@ -338,8 +392,7 @@ class MusicSyncApp:
                     if progress > 0.90 and "END" not in self.shown_phases:
                         print(f"Showing Title (End): {track_name}")
                         self.shown_phases.add("END")
-                        try: self.client.send_text(track_name, animation=1, speed=100)
-                        except: pass
+                        await self.show_title(track_name)
                         mode = "TITLE"
                         current_title_duration = self.calculate_text_duration(track_name)
                         last_switch_time = current_time
@@ -350,18 +403,18 @@ class MusicSyncApp:
                         print("Music Paused/Idle: Switching to Custom Clock Mode...")
                         self.is_paused = True
                         self.show_custom_clock()
+                        self.clock.skip_to_now()
                         last_switch_time = current_time
-                    elif current_time - last_switch_time >= 30:
-                        # Periodically refresh clock while idle to keep time accurate
-                        self.show_custom_clock()
+                    elif self.clock.due():
+                        # Pre-rendered next minute, sent so it lands on hh:mm:00
+                        self.clock.tick()
                         last_switch_time = current_time
                 
                 elif is_playing and self.is_paused:
                     print("Music Resumed: Showing title...")
                     self.is_paused = False
                     if self.current_track_name:
-                        try: self.client.send_text(self.current_track_name, animation=1, speed=100)
-                        except: pass
+                        await self.show_title(self.current_track_name)
                     mode = "TITLE"
                     current_title_duration = self.calculate_text_duration(self.current_track_name)
                     last_switch_time = current_time
@@ -371,15 +424,15 @@ class MusicSyncApp:
                     if mode == "TITLE":
                         if current_time - last_switch_time >= current_title_duration:
                             print("Rotation: Switching to Music Art...")
-                            if self.current_thumbnail_ref:
-                                await self.process_and_send_thumbnail(self.current_thumbnail_ref)
+                            await self.send_thumbnail()
                             mode = "MUSIC"
                             last_switch_time = current_time
                     
                     elif mode == "MUSIC":
                         if current_time - last_switch_time >= MUSIC_DURATION:
                             print(f"Rotation: Switching to Custom Clock for 5s...")
-                            self.show_custom_clock()
+                            progress = position / duration if duration > 0 else None
+                            self.show_custom_clock(await self.track_color(), progress)
                             mode = "CLOCK"
                             last_switch_time = current_time
                     
@@ -388,20 +441,35 @@ class MusicSyncApp:
                         # (Though for a 5s window, it's not strictly necessary)
                         if current_time - last_switch_time >= CLOCK_DURATION:
                             print("Rotation: Music Mode...")
-                            if self.current_thumbnail_ref:
-                                await self.process_and_send_thumbnail(self.current_thumbnail_ref)
+                            await self.send_thumbnail()
                             mode = "MUSIC"
                             last_switch_time = current_time
                 
-                await asyncio.sleep(CHECK_INTERVAL)
+                # While idle, wake up early enough to hit the next minute boundary
+                if self.is_paused:
+                    await asyncio.sleep(min(CHECK_INTERVAL, self.clock.time_until_due()))
+                else:
+                    await asyncio.sleep(CHECK_INTERVAL)
         except KeyboardInterrupt:
             print("Stopping...")
         finally:
+            stall_task.cancel()
+            self.finish_play()
+            self.history.close()
+            self.stall_monitor.report()
+            self.pool.shutdown()
+            self.clock.report()
             if self.is_connected:
                 # Neutral state: white clock
                 self.show_custom_clock("ffffff")
+                try:
+                    self.transitions.flush(wait=True)
+                except Exception as e:
+                    print(f"Failed to land transition frame: {e}")
                 self.client.disconnect()
 
 if __name__ == "__main__":
     app = MusicSyncApp(DEVICE_MAC)
     asyncio.run(app.run())
+    if app.watchdog.restart_requested:
+        restart_process()
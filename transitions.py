@@ -0,0 +1,140 @@
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+from slot_cache import frame_hash
+
+# Configuration
+load_dotenv()
+TRANSITION = os.getenv("TRANSITION", "none")  # none, crossfade, slide or wipe
+MAX_FRAMES = 8
+FRAME_MS = 60
+TRANSITION_BUDGET = 1.5  # Seconds of upload we are willing to spend on a transition
+CACHE_SIZE = 16          # Precomputed (from, to) sequences kept in memory
+PAIR_MEMORY = 64         # (from, to) pairs remembered to tell which ones repeat
+DEFAULT_FRAME_BYTES = 350
+
+KINDS = ("crossfade", "slide", "wipe")
+
+def blend_frames(kind, a, b, n):
+    """Returns n frames going from `a` to `b` (both HxWx3 uint8), ending on `b`.
+
+    All frames are computed at once by broadcasting over a leading frame axis.
+    """
+    t = np.arange(1, n + 1, dtype=np.float32) / n
+    width = a.shape[1]
+
+    if kind == "crossfade":
+        t = t[:, None, None, None]
+        frames = a.astype(np.float32) * (1 - t) + b.astype(np.float32) * t
+        return np.rint(frames).astype(np.uint8)
+
+    offset = np.rint(t * width).astype(np.intp)
+    x = np.arange(width)
+
+    if kind == "slide":
+        # `b` pushes `a` out to the left: read a moving window over [a | b]
+        strip = np.concatenate([a, b], axis=1)
+        cols = x[None, :] + offset[:, None]
+        return strip[:, cols].transpose(1, 0, 2, 3)
+
+    if kind == "wipe":
+        mask = x[None, :] < offset[:, None]
+        return np.where(mask[:, None, :, None], b[None], a[None])
+
+    raise ValueError(f"Unknown transition: {kind}")
+
+class TransitionRenderer:
+    """Shows frames through a short precomputed transition instead of a hard cut.
+
+    Each transition is a single GIF upload that plays once and ends on the
+    target frame. A (from, to) pair that has been seen before is stored in a
+    slot, so repeating it is one `show_slot`; one-off pairs take no slot and
+    never evict cached frames. Targets with more colors than a GIF frame can
+    hold are landed exactly by `flush()` once the animation has played. The
+    frame count shrinks when the measured link is slow.
+    """
+
+    def __init__(self, slots, kind=TRANSITION, max_frames=MAX_FRAMES, budget=TRANSITION_BUDGET):
+        self.slots = slots
+        self.kind = kind if kind in KINDS else None
+        self.max_frames = max_frames
+        self.budget = budget
+        self.frame_bytes = DEFAULT_FRAME_BYTES  # Learned from the GIFs we upload
+        self.cache = OrderedDict()
+        self.seen = OrderedDict()
+        self.pending = None  # (due time, frame, temp path) still to land exactly
+
+    def frame_count(self):
+        """Returns how many transition frames fit the upload budget on the current link."""
+        if self.slots.link_rate is None:
+            return self.max_frames
+        fits = int(self.budget * self.slots.link_rate / self.frame_bytes)
+        return max(0, min(self.max_frames, fits))
+
+    def sequence(self, from_img, to_img, n):
+        key = (frame_hash(from_img), frame_hash(to_img), self.kind, n)
+        frames = self.cache.get(key)
+        if frames is not None:
+            self.cache.move_to_end(key)
+            return frames
+
+        a = np.asarray(from_img.convert('RGB'))
+        b = np.asarray(to_img.convert('RGB'))
+        frames = [Image.fromarray(f) for f in blend_frames(self.kind, a, b, n)]
+        self.cache[key] = frames
+        if len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return frames
+
+    def show(self, from_img, to_img, temp_path, gif_path="transition.gif"):
+        """Shows `to_img`, animating from `from_img` when a transition is enabled and affordable.
+
+        Never blocks for the animation; returns True if the panel showed it from a slot.
+        """
+        self.pending = None
+        n = self.frame_count() if self.kind and from_img is not None else 0
+        if n < 2 or from_img.size != to_img.size:
+            return self.slots.show(to_img, temp_path)
+
+        frames = self.sequence(from_img, to_img, n)
+        durations = [FRAME_MS] * n
+        pair = (frame_hash(from_img), frame_hash(to_img), self.kind, n)
+        if pair in self.seen:
+            self.seen.move_to_end(pair)
+            cached = self.slots.show_animation(frames, durations, gif_path, loop=None)
+        else:
+            self.seen[pair] = True
+            if len(self.seen) > PAIR_MEMORY:
+                self.seen.popitem(last=False)
+            self.slots.play_once(frames, durations, gif_path)
+            cached = False
+        if not cached and os.path.exists(gif_path):
+            self.frame_bytes = max(1, os.path.getsize(gif_path) // n)
+            os.remove(gif_path)
+
+        if not self.slots.gif_exact(to_img):
+            # The GIF's last frame is palette-reduced, put the real one up after the animation
+            self.pending = (time.monotonic() + n * FRAME_MS / 1000, to_img, temp_path)
+        return cached
+
+    def flush(self, wait=False):
+        """Lands a pending exact target frame once its transition has played.
+
+        Called from the main loop; with `wait`, sleeps until it is due (for shutdown).
+        """
+        if self.pending is None:
+            return
+        due, img, temp_path = self.pending
+        if wait:
+            time.sleep(max(0.0, due - time.monotonic()))
+        elif time.monotonic() < due:
+            return
+        self.pending = None
+        self.slots.show(img, temp_path)
+
+    def cancel(self):
+        """Forgets a pending frame, e.g. when something else was put on the panel."""
+        self.pending = None
@@ -0,0 +1,124 @@
+import time
+
+# wttr.in weather codes per pictogram
+SUNNY = (113,)
+PARTLY_CLOUDY = (116,)
+CLOUDY = (119, 122)
+FOG = (143, 248, 260)
+LIGHT_RAIN = (176, 263, 266, 293, 296, 353)
+HEAVY_RAIN = (299, 302, 305, 308, 356, 359)
+SNOW = (179, 227, 230, 323, 326, 329, 332, 335, 338, 368, 371)
+SLEET = (182, 185, 281, 284, 311, 314, 317, 320, 350, 362, 365, 374, 377)
+THUNDER = (200, 386, 389, 392, 395)
+
+WEATHER_GROUPS = {
+    "sunny": SUNNY,
+    "partly cloudy": PARTLY_CLOUDY,
+    "cloudy": CLOUDY,
+    "fog": FOG,
+    "light rain": LIGHT_RAIN,
+    "heavy rain": HEAVY_RAIN,
+    "snow": SNOW,
+    "sleet": SLEET,
+    "thunder": THUNDER,
+}
+
+def is_night(when=None):
+    """True between 19:00 and 07:00 local time (`when` in epoch seconds, default now)."""
+    hour = time.localtime(when).tm_hour
+    return hour >= 19 or hour < 7
+
+def draw_weather_pictogram(draw, code, night=False):
+    """Draws a highly granular 16x32 weather pictogram on the left side.
+
+    Shared by the clock scripts and preview_icons.py; unknown codes get a
+    plain grey cloud.
+    """
+    code = int(code) if code else 113
+
+    # 1. SUNNY / CLEAR
+    if code in SUNNY:
+        if night:
+            # Moon
+            draw.ellipse([4, 12, 12, 20], fill=(240, 240, 240))
+            draw.ellipse([7, 10, 15, 18], fill=(0, 0, 0))
+        else:
+            # Sun
+            draw.ellipse([5, 13, 11, 19], fill=(255, 200, 0))
+            draw.point([(8, 11), (8, 21), (3, 16), (13, 16)], fill=(255, 180, 0))
+            draw.point([(5, 13), (11, 13), (5, 19), (11, 19)], fill=(255, 150, 0))
+
+    # 2. PARTLY CLOUDY
+    elif code in PARTLY_CLOUDY:
+        if night:
+            # Small Moon behind cloud
+            draw.ellipse([7, 11, 13, 17], fill=(200, 200, 200))
+            draw.ellipse([9, 10, 15, 15], fill=(0, 0, 0))
+        else:
+            # Small Sun behind cloud
+            draw.ellipse([8, 11, 13, 16], fill=(255, 200, 0))
+        # Cloud
+        draw.ellipse([3, 15, 10, 21], fill=(120, 120, 130) if night else (180, 180, 180))
+        draw.ellipse([6, 14, 13, 19], fill=(80, 80, 90) if night else (140, 140, 150))
+
+    # 3. CLOUDY / OVERCAST
+    elif code in CLOUDY:
+        if night:
+            # Tiny moon peeking from top-right
+            draw.ellipse([9, 10, 14, 15], fill=(180, 180, 180))
+            draw.ellipse([11, 9, 16, 13], fill=(0, 0, 0))
+        base = (80, 80, 100) if night else (160, 160, 170)
+        draw.ellipse([3, 15, 10, 21], fill=base)
+        draw.ellipse([7, 16, 13, 22], fill=(base[0]-20, base[1]-20, base[2]-20))
+        draw.ellipse([5, 13, 11, 18], fill=(base[0]+20, base[1]+20, base[2]+20))
+
+    # 4. FOG / MIST
+    elif code in FOG:
+        if night:
+            # Very faint moon glow behind fog
+            draw.ellipse([8, 11, 12, 15], fill=(60, 60, 70))
+        col = (80, 80, 100) if night else (180, 180, 200)
+        draw.line([(4, 14), (12, 14)], fill=col)
+        draw.line([(3, 17), (11, 17)], fill=col)
+        draw.line([(5, 20), (13, 20)], fill=col)
+
+    # 5. LIGHT RAIN / DRIZZLE
+    elif code in LIGHT_RAIN:
+        if night:
+            # Small moon behind rain cloud
+            draw.ellipse([9, 9, 14, 14], fill=(150, 150, 160))
+            draw.ellipse([11, 8, 16, 12], fill=(0, 0, 0))
+        draw.ellipse([3, 12, 12, 18], fill=(60, 60, 80) if night else (100, 100, 130))
+        draw.point([(6, 20), (10, 21)], fill=(0, 150, 255))
+
+    # 6. HEAVY RAIN
+    elif code in HEAVY_RAIN:
+        if night:
+            # Tiny moon behind storm cloud
+            draw.ellipse([9, 8, 13, 12], fill=(100, 100, 110))
+            draw.ellipse([11, 7, 15, 11], fill=(0, 0, 0))
+        draw.ellipse([3, 12, 12, 18], fill=(40, 40, 55) if night else (70, 70, 90))
+        for x in [5, 8, 11]: draw.line([(x, 20), (x-1, 23)], fill=(0, 120, 255))
+
+    # 7. SNOW
+    elif code in SNOW:
+        if night:
+            # Soft glow behind snow
+            draw.ellipse([6, 10, 10, 14], fill=(60, 60, 80))
+        draw.point([(8, 12), (4, 15), (12, 15), (8, 18), (4, 21), (12, 21), (8, 24)], fill=(255, 255, 255))
+
+    # 8. SLEET / ICE PELLETS
+    elif code in SLEET:
+        if night:
+            draw.ellipse([8, 9, 12, 13], fill=(100, 100, 120))
+        draw.ellipse([4, 12, 11, 17], fill=(120, 120, 150) if night else (150, 150, 180))
+        draw.point([(6, 19), (10, 20)], fill=(180, 180, 230)) # Ice
+        draw.point([(8, 22)], fill=(0, 150, 255)) # Rain
+
+    # 9. THUNDER
+    elif code in THUNDER:
+        draw.ellipse([3, 12, 12, 18], fill=(30, 30, 40) if night else (60, 60, 70))
+        draw.line([(8, 19), (6, 22), (10, 22), (8, 26)], fill=(255, 255, 0))
+    
+    else: # Default
+        draw.ellipse([3, 14, 13, 20], fill=(100, 100, 100) if night else (120, 120, 120))